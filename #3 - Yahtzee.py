@@ -3,6 +3,9 @@ Planner for Yahtzee
 Simplifications:  only allow discard and roll, only score against upper level
 """
 
+import math
+import random
+
 # Used to increase the timeout, if necessary
 import codeskulptor
 codeskulptor.set_timeout(20)
@@ -54,6 +57,80 @@ def tuple_diff(tup1, tup2):
         list1.remove(list2[idx])
     return list1
 
+def num_combinations(num_items, num_chosen):
+    """
+    Compute the number of ways to choose num_chosen of num_items
+    Returns an integer
+    """
+    if num_chosen < 0 or num_chosen > num_items:
+        return 0
+    result = 1
+    for idx in range(num_chosen):
+        result = result * (num_items - idx) / (idx + 1)
+    return result
+
+
+def roll_multiplicity(roll):
+    """
+    Compute the number of ordered sequences that sort to roll
+    Returns an integer
+    """
+    multiplicity = 1
+    remaining = len(roll)
+    run_length = 0
+    for pos in range(len(roll)):
+        run_length += 1
+        if pos == len(roll) - 1 or roll[pos + 1] != roll[pos]:
+            multiplicity *= num_combinations(remaining, run_length)
+            remaining -= run_length
+            run_length = 0
+    return multiplicity
+
+
+def iter_roll_multisets(num_dice, num_die_sides):
+    """
+    Generator that yields (sorted roll, multiplicity) pairs for every
+    multiset of num_dice dice, each with num_die_sides.  The
+    multiplicities sum to num_die_sides ** num_dice.
+    """
+    roll = [1] * num_dice
+    while True:
+        yield tuple(roll), roll_multiplicity(roll)
+        pos = num_dice - 1
+        while pos >= 0 and roll[pos] == num_die_sides:
+            pos -= 1
+        if pos < 0:
+            return
+        roll[pos] += 1
+        for idx in range(pos + 1, num_dice):
+            roll[idx] = roll[pos]
+
+
+def iter_count_blocks(held_dice, num_die_sides, num_free_dice, 
+                      block_size = 1024):
+    """
+    Generator that yields the hands made of held_dice plus every roll
+    of num_free_dice in blocks of at most block_size.  Each block is a
+    pair of lists: per-face count rows for score_counts and the
+    multiplicity of each row.
+    """
+    held_counts = hand_counts(held_dice, num_die_sides)
+    count_rows = []
+    multiplicities = []
+    for roll, multiplicity in iter_roll_multisets(num_free_dice, num_die_sides):
+        counts = list(held_counts)
+        for card in roll:
+            counts[card - 1] += 1
+        count_rows.append(counts)
+        multiplicities.append(multiplicity)
+        if len(count_rows) == block_size:
+            yield count_rows, multiplicities
+            count_rows = []
+            multiplicities = []
+    if count_rows:
+        yield count_rows, multiplicities
+
+
 def score(hand):
     """
     Compute the maximal score for a Yahtzee hand according to the
@@ -61,19 +138,47 @@ def score(hand):
     hand: full yahtzee hand
     Returns an integer score 
     """
-    max_score = 0
-    
-    scores = {1:0, 2:0, 3:0, 4:0, 5:0, 6:0, 7:0, 8:0, 9:0}
+    scores = {}
     
     for card in hand:
-        max_score += card
-        scores[card] += card
+        scores[card] = scores.get(card, 0) + card
                 
-    max_score = max(scores.values())
+    max_score = max(scores.values() + [0])
     return max_score
 
 
-def expected_value(held_dice, num_die_sides, num_free_dice):
+def hand_counts(hand, num_die_sides):
+    """
+    Count the dice in hand showing each face.
+    Returns a list whose entry face - 1 is the number of dice showing
+    face
+    """
+    counts = [0] * num_die_sides
+    for card in hand:
+        counts[card - 1] += 1
+    return counts
+
+
+def score_counts(count_rows):
+    """
+    Compute the upper section maxima for a batch of hands given as
+    per-face counts, one row of hand_counts per hand.
+    Returns a list of integer scores
+    """
+    return [max([(face + 1) * count for face, count in enumerate(counts)] + [0])
+            for counts in count_rows]
+
+
+def batch_score(hands, num_die_sides):
+    """
+    Compute the upper section maxima for a batch of hands with dice
+    of num_die_sides sides.
+    Returns a list of integer scores in the same order as hands
+    """
+    return score_counts([hand_counts(hand, num_die_sides) for hand in hands])
+
+
+def expected_value(held_dice, num_die_sides, num_free_dice, tolerance = None):
     """
     Compute the expected value of the held_dice given that there
     are num_free_dice to be rolled, each with num_die_sides.
@@ -81,21 +186,89 @@ def expected_value(held_dice, num_die_sides, num_free_dice):
     held_dice: dice that you will hold
     num_die_sides: number of sides on each die
     num_free_dice: number of dice to be rolled
+    tolerance: if given, estimate the value by sampling until the
+    confidence interval is narrower than tolerance on either side
 
     Returns a floating point expected value
     """
+    if tolerance != None:
+        return estimate_expected_value(held_dice, num_die_sides,
+                                       num_free_dice, tolerance)[0]
     
-    expected_val = 0.0
-    outcomes = []
-    for idx in range(1, num_die_sides + 1):
-        outcomes.append(idx)
-        
-    all_rolls = gen_all_sequences(outcomes, num_free_dice)
-    scores = [score(held_dice + roll) for roll in all_rolls]
-    expected_val = sum(scores) / float(len(scores))
+    # Stream the distinct rolls block by block, weighting each by the
+    # number of ordered rolls it stands for
+    total = 0.0
+    for count_rows, multiplicities in iter_count_blocks(held_dice, num_die_sides,
+                                                        num_free_dice):
+        scores = score_counts(count_rows)
+        for idx in range(len(scores)):
+            total += scores[idx] * multiplicities[idx]
+    expected_val = total / num_die_sides ** num_free_dice
     return expected_val
 
 
+# Normal quantile for the sampled confidence intervals (95%)
+CONFIDENCE_Z = 1.96
+
+# Rolls drawn per batch and the cap on rolls per hold when sampling
+SAMPLE_BATCH = 1000
+MAX_SAMPLES = 1000000
+
+def sample_scores(held_counts, num_die_sides, num_free_dice, num_samples):
+    """
+    Roll num_free_dice dice num_samples times on top of the held dice,
+    given as per-face counts, and score the batch of resulting hands.
+    Returns a tuple of the sum and the sum of squares of the scores
+    """
+    count_rows = []
+    for dummy_idx in range(num_samples):
+        counts = list(held_counts)
+        for dummy_die in range(num_free_dice):
+            counts[random.randrange(num_die_sides)] += 1
+        count_rows.append(counts)
+    scores = score_counts(count_rows)
+    return sum(scores), sum([val * val for val in scores])
+
+
+def confidence_interval(num_samples, total, total_sq):
+    """
+    Compute the mean of num_samples sampled scores, given their sum
+    and sum of squares, and the half width of its confidence interval.
+    Returns a tuple (mean, half width)
+    """
+    mean = float(total) / num_samples
+    if num_samples < 2:
+        return mean, float("inf")
+    variance = max(total_sq - total * mean, 0.0) / (num_samples - 1)
+    return mean, CONFIDENCE_Z * math.sqrt(variance / num_samples)
+
+
+def estimate_expected_value(held_dice, num_die_sides, num_free_dice,
+                            tolerance, batch_size = SAMPLE_BATCH,
+                            max_samples = MAX_SAMPLES):
+    """
+    Estimate expected_value by rolling the free dice in batches until
+    the confidence interval is narrower than tolerance on either side
+    or max_samples rolls have been drawn.
+
+    Returns a tuple of the estimate, the half width of its confidence
+    interval and the number of rolls drawn
+    """
+    held_counts = hand_counts(held_dice, num_die_sides)
+    num_samples = 0
+    total = 0.0
+    total_sq = 0.0
+    while True:
+        batch_total, batch_total_sq = sample_scores(held_counts, num_die_sides,
+                                                    num_free_dice, batch_size)
+        num_samples += batch_size
+        total += batch_total
+        total_sq += batch_total_sq
+        mean, half_width = confidence_interval(num_samples, total, total_sq)
+        if half_width <= tolerance or num_samples >= max_samples:
+            return mean, half_width, num_samples
+
+
 def gen_all_holds(hand):
     """
     Generate all possible choices of dice from hand to hold.
@@ -110,17 +283,25 @@ def gen_all_holds(hand):
     return ans
        
  
-def strategy(hand, num_die_sides):
+def strategy(hand, num_die_sides, tolerance = None):
     """
     Compute the hold that maximizes the expected value when the
     discarded dice are rolled.
 
     hand: full yahtzee hand
     num_die_sides: number of sides on each die
+    tolerance: if given, estimate expected values by sampling, see
+    sampled_strategy
 
     Returns a tuple where the first element is the expected score and
     the second element is a tuple of the dice to hold
     """
+    if tolerance != None:
+        return sampled_strategy(hand, num_die_sides, tolerance)
+
+    key = (len(hand), num_die_sides)
+    if key in STRATEGY_TABLES:
+        return lookup_strategy(hand, num_die_sides)
 
     all_holds = gen_all_holds(hand)
     max_exp_val = 0.0
@@ -131,7 +312,203 @@ def strategy(hand, num_die_sides):
         if exp_val > max_exp_val:
             max_exp_val = exp_val
             max_hold = hold
-     return (max_exp_val, max_hold)
+    return (max_exp_val, max_hold)
+
+
+
+def sampled_strategy(hand, num_die_sides, tolerance,
+                     batch_size = SAMPLE_BATCH, max_samples = MAX_SAMPLES):
+    """
+    Estimate the best hold by sampling every hold one batch at a time.
+    After each round, holds whose upper confidence bound falls below
+    the best lower bound are dropped, so only close contenders are
+    sampled down to tolerance.
+
+    Returns a tuple where the first element is the estimated score and
+    the second element is a tuple of the dice to hold
+    """
+    stats = {}
+    for hold in gen_all_holds(hand):
+        stats[hold] = [0, 0.0, 0.0]
+    remaining = stats.keys()
+    
+    while True:
+        bounds = {}
+        for hold in remaining:
+            stat = stats[hold]
+            if stat[0] < max_samples:
+                batch_total, batch_total_sq = sample_scores(
+                    hand_counts(hold, num_die_sides), num_die_sides,
+                    len(hand) - len(hold), batch_size)
+                stat[0] += batch_size
+                stat[1] += batch_total
+                stat[2] += batch_total_sq
+            bounds[hold] = confidence_interval(stat[0], stat[1], stat[2])
+        
+        best_lower = max([mean - half_width 
+                          for mean, half_width in bounds.values()])
+        remaining = [hold for hold in remaining
+                     if bounds[hold][0] + bounds[hold][1] >= best_lower]
+        
+        done = True
+        for hold in remaining:
+            if bounds[hold][1] > tolerance and stats[hold][0] < max_samples:
+                done = False
+        if done or len(remaining) == 1:
+            break
+    
+    max_hold = max(remaining, key = lambda hold: bounds[hold][0])
+    return (bounds[max_hold][0], max_hold)
+
+
+# Number of rolls in a full turn: the initial roll plus two rerolls
+NUM_ROLLS = 3
+
+# Distributions of sorted rolls, keyed by (num_dice, num_die_sides)
+ROLL_DISTRIBUTIONS = {}
+
+# Value iteration tables, keyed by (num_dice, num_die_sides).  Entry
+# rolls_left of each list maps a sorted hand to (expected score, hold)
+TURN_TABLES = {}
+
+def roll_distribution(num_dice, num_die_sides):
+    """
+    Compute the distribution of sorted outcomes when num_dice dice,
+    each with num_die_sides, are rolled.
+
+    Returns a list of (sorted roll, probability) pairs.  The list is
+    computed once per (num_dice, num_die_sides) and then cached.
+    """
+    key = (num_dice, num_die_sides)
+    if key not in ROLL_DISTRIBUTIONS:
+        total = float(num_die_sides ** num_dice)
+        ROLL_DISTRIBUTIONS[key] = [(roll, multiplicity / total)
+                                   for roll, multiplicity
+                                   in iter_roll_multisets(num_dice, num_die_sides)]
+    return ROLL_DISTRIBUTIONS[key]
+
+
+def turn_table(num_dice, num_die_sides, rolls_left):
+    """
+    Run value iteration over sorted hands of num_dice dice until the
+    table for rolls_left remaining rolls is available.
+
+    Returns a dictionary mapping each sorted hand to a tuple of the
+    expected score and the best tuple of dice to hold.
+    """
+    key = (num_dice, num_die_sides)
+    if key not in TURN_TABLES:
+        # With no rolls left the hand is scored as it stands
+        hands = [hand for hand, dummy_prob
+                 in roll_distribution(num_dice, num_die_sides)]
+        scores = batch_score(hands, num_die_sides)
+        TURN_TABLES[key] = [dict((hand, (float(hand_score), hand))
+                                 for hand, hand_score in zip(hands, scores))]
+    tables = TURN_TABLES[key]
+    
+    while len(tables) <= rolls_left:
+        next_table = tables[-1]
+        
+        # The value of a hold does not depend on the hand it came from
+        hold_values = {}
+        table = {}
+        for hand in next_table:
+            max_exp_val = -1.0
+            max_hold = ()
+            for hold in gen_all_holds(hand):
+                if hold not in hold_values:
+                    exp_val = 0.0
+                    free_dice = num_dice - len(hold)
+                    for roll, prob in roll_distribution(free_dice, num_die_sides):
+                        new_hand = tuple(sorted(hold + roll))
+                        exp_val += prob * next_table[new_hand][0]
+                    hold_values[hold] = exp_val
+                if hold_values[hold] > max_exp_val:
+                    max_exp_val = hold_values[hold]
+                    max_hold = hold
+            table[hand] = (max_exp_val, max_hold)
+        tables.append(table)
+    return tables[rolls_left]
+
+
+def plan_turn(hand, num_die_sides, rolls_left = NUM_ROLLS - 1):
+    """
+    Compute the hold that maximizes the expected final score of the
+    turn when rolls_left rolls remain and every later hold is also
+    chosen optimally.
+
+    hand: full yahtzee hand
+    num_die_sides: number of sides on each die
+    rolls_left: number of rerolls remaining in the turn
+
+    Returns a tuple where the first element is the expected score and
+    the second element is a tuple of the dice to hold
+    """
+    table = turn_table(len(hand), num_die_sides, rolls_left)
+    return table[tuple(sorted(hand))]
+
+# Precomputed strategy tables, keyed by (num_dice, num_die_sides).  Each
+# table is a pair of lists indexed by hand_index: the expected score and
+# the held positions of the sorted hand as a bit mask
+STRATEGY_TABLES = {}
+
+def hand_index(hand):
+    """
+    Compute the rank of a sorted hand among all sorted hands with the
+    same number of dice.  Distinct hands get distinct ranks in
+    range(num_combinations(num_dice + num_die_sides - 1, num_dice)),
+    so the rank is a minimal perfect hash of the multiset.
+    Returns an integer
+    """
+    index = 0
+    for pos, card in enumerate(sorted(hand)):
+        index += num_combinations(card - 1 + pos, pos + 1)
+    return index
+
+
+def build_strategy_table(num_dice, num_die_sides):
+    """
+    Solve strategy once for every sorted hand of num_dice dice, each
+    with num_die_sides, and store the results for lookup_strategy.
+    Hold values are shared between hands by turn_table, so each
+    distinct hold is evaluated only once.
+    """
+    table = turn_table(num_dice, num_die_sides, 1)
+    size = num_combinations(num_dice + num_die_sides - 1, num_dice)
+    values = [0.0] * size
+    hold_masks = [0] * size
+    for hand, (exp_val, hold) in table.items():
+        index = hand_index(hand)
+        values[index] = exp_val
+        
+        # Match the held dice to positions of the sorted hand
+        mask = 0
+        pos = 0
+        for card in hold:
+            while hand[pos] != card:
+                pos += 1
+            mask |= 1 << pos
+            pos += 1
+        hold_masks[index] = mask
+    STRATEGY_TABLES[(num_dice, num_die_sides)] = (values, hold_masks)
+
+
+def lookup_strategy(hand, num_die_sides):
+    """
+    Answer strategy(hand, num_die_sides) from the table built by
+    build_strategy_table.
+
+    Returns a tuple where the first element is the expected score and
+    the second element is a tuple of the dice to hold
+    """
+    values, hold_masks = STRATEGY_TABLES[(len(hand), num_die_sides)]
+    sorted_hand = sorted(hand)
+    index = hand_index(sorted_hand)
+    mask = hold_masks[index]
+    hold = tuple([sorted_hand[pos] for pos in range(len(sorted_hand))
+                  if mask & (1 << pos)])
+    return (values[index], hold)
+
 
 def run_example():
     """
@@ -151,6 +528,9 @@ def run_example():
     hand = (1,)
     hand_score, hold = strategy(hand, num_die_sides)
     print "Best strategy for hand", hand, "is to hold", hold, "with expected score", hand_score
+    #build_strategy_table(5, num_die_sides)
+    #hand_score, hold = plan_turn((1, 1, 2, 5, 6), num_die_sides, 2)
+    #print "Best first hold for a full turn is", hold, "with expected score", hand_score
     #print "expected value", expected_value((2,2),6, 2)
     
 run_example()
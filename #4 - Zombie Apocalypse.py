@@ -3,8 +3,8 @@ Student portion of Zombie Apocalypse mini-project
 """
 
 import random
+import time
 import poc_grid
-import poc_queue
 import poc_zombie_gui
 
 # global constants
@@ -12,10 +12,54 @@ EMPTY = 0
 FULL = 1
 FOUR_WAY = 0
 EIGHT_WAY = 1
+OCTILE = 2
 OBSTACLE = "obstacle"
 HUMAN = "human"
 ZOMBIE = "zombie"
 
+# Value of the border cells that pad the flat obstacle mask
+OUTSIDE = 2
+
+# Step costs for OCTILE distances; 3 / 2 approximates the square root
+# of 2 with integer costs, so distances can be kept in buckets
+OCTILE_STRAIGHT = 2
+OCTILE_DIAGONAL = 3
+
+# Phases of a simulation step, in the order step runs them
+STEP_PHASES = ["zombie field", "human moves", "human field", "zombie moves"]
+
+# Configurations swept by run_benchmarks
+BENCHMARK_SIZES = [(30, 40), (100, 100), (300, 300)]
+BENCHMARK_DENSITIES = [0.0, 0.2]
+BENCHMARK_POPULATIONS = [10, 100, 1000]
+BENCHMARK_STEPS = 10
+
+# Step cap for each scenario played by run_scenarios
+SCENARIO_STEPS = 200
+
+# Simulation reused by the scenarios that run_scenarios plays in this
+# process
+SCENARIO_WORKER = {}
+
+# Frames held in each chunk of a TrajectoryRecorder
+FRAMES_PER_CHUNK = 1000
+
+# Side length of the square tiles used by TiledGrid distance fields
+TILE_SIZE = 64
+
+# Largest value of the unsigned 16 bit tiles of a TiledField, used as
+# its sentinel on grids with more cells than that.  A search that has
+# to reach a cell this many steps away or more raises ValueError.
+TILED_SENTINEL = 65535
+
+# Tiles of each TiledField kept in memory before spilling to a file
+TILE_CACHE = 1024
+
+# Dynamic distance fields are rebuilt from scratch rather than repaired
+# when more than this fraction of the sources moved, or when a repair
+# clears more than this fraction of the grid
+REPAIR_FRACTION = 0.25
+
 
 class Zombie(poc_grid.Grid):
     """
@@ -32,6 +76,8 @@ class Zombie(poc_grid.Grid):
         poc_grid.Grid.__init__(self, grid_height, grid_width)
         self._grid_height = grid_height
         self._grid_width = grid_width
+        self._dynamic = False
+        self.init_buffers()
         
         if obstacle_list != None:
             for cell in obstacle_list:
@@ -45,14 +91,117 @@ class Zombie(poc_grid.Grid):
         else:
             self._human_list = []
         
+    def init_buffers(self):
+        """
+        Allocate the flat buffers used by compute_distance_field.
+        Cells are stored row by row inside a one cell border of OUTSIDE
+        cells, so neighbors can be found by adding fixed offsets
+        without any bounds checks.
+        """
+        self._stride = self._grid_width + 2
+        num_cells = (self._grid_height + 2) * self._stride
+        self._sentinel = self._grid_height * self._grid_width
+        
+        self._blocked = [OUTSIDE] * num_cells
+        for row in range(self._grid_height):
+            start = self.cell_index(row, 0)
+            self._blocked[start:start + self._grid_width] = self._cells[row]
+        
+        self._blank_fields = {}
+        self._distance_buffers = {}
+        self._field_metrics = {}
+        self._field_sources = {}
+        self._field_edits = {}
+        self._components = {}
+        self._queue = [0] * num_cells
+        
+        straight = [-self._stride, self._stride, -1, 1]
+        diagonal = [-self._stride - 1, -self._stride + 1,
+                    self._stride - 1, self._stride + 1]
+        self._offsets = {FOUR_WAY: straight,
+                         EIGHT_WAY: straight + diagonal,
+                         OCTILE: straight + diagonal}
+        self._costs = {FOUR_WAY: [1] * 4,
+                       EIGHT_WAY: [1] * 8,
+                       OCTILE: [OCTILE_STRAIGHT] * 4 + [OCTILE_DIAGONAL] * 4}
+    
+    def field_sentinel(self, metric):
+        """
+        Return the distance given to unreachable cells and obstacles
+        in fields of the given metric
+        """
+        return self._sentinel * max(self._costs[metric])
+    
+    def set_dynamic_fields(self, dynamic):
+        """
+        Turn dynamic distance fields on or off.  A dynamic field keeps
+        the sources and obstacle edits it was computed from, and the
+        next compute_distance_field call repairs only the cells
+        affected by what changed instead of searching the whole grid.
+        """
+        self._dynamic = dynamic
+        self._field_metrics = {}
+        self._field_sources = {}
+        self._field_edits = {}
+    
+    def cell_index(self, row, col):
+        """
+        Return the index of cell (row, col) in the flat buffers
+        """
+        return (row + 1) * self._stride + col + 1
+    
+    def cell_position(self, index):
+        """
+        Return the (row, col) of the cell at index in the flat buffers
+        """
+        return (index / self._stride - 1, index % self._stride - 1)
+        
     def clear(self):
         """
         Set cells in obstacle grid to be empty
         Reset zombie and human lists to be empty
         """
         poc_grid.Grid.clear(self)
+        self.init_buffers()
         self._human_list = []
         self._zombie_list = []
+    
+    def reset_scenario(self, obstacle_list, zombie_list, human_list):
+        """
+        Replace the obstacles, zombies and humans with the given ones,
+        keeping the flat buffers already allocated for this grid
+        """
+        poc_grid.Grid.clear(self)
+        for row in range(self._grid_height):
+            start = self.cell_index(row, 0)
+            self._blocked[start:start + self._grid_width] = self._cells[row]
+        self.set_dynamic_fields(self._dynamic)
+        self._components = {}
+        
+        for cell in obstacle_list:
+            self.set_full(cell[0], cell[1])
+        self._zombie_list = list(zombie_list)
+        self._human_list = list(human_list)
+        
+    def set_empty(self, row, col):
+        """
+        Set cell (row, col) to be empty
+        """
+        poc_grid.Grid.set_empty(self, row, col)
+        self._blocked[self.cell_index(row, col)] = EMPTY
+        self._components = {}
+        for edits in self._field_edits.values():
+            edits.append(self.cell_index(row, col))
+    
+    def set_full(self, row, col):
+        """
+        Set cell (row, col) to be an obstacle
+        """
+        poc_grid.Grid.set_full(self, row, col)
+        self._blocked[self.cell_index(row, col)] = FULL
+        self._components = {}
+        for edits in self._field_edits.values():
+            edits.append(self.cell_index(row, col))
         
         
         
@@ -103,46 +252,277 @@ class Zombie(poc_grid.Grid):
             yield self._human_list[num]
             num = num + 1
         
-    def compute_distance_field(self, entity_type):
+    def remove_caught_humans(self):
         """
-        Function computes a 2D distance field
-        Distance at member of entity_queue is zero
-        Shortest paths avoid obstacles and use distance_type distances
+        Remove the humans that share a cell with a zombie
+        Returns the number of humans removed
         """
+        zombie_cells = set(self._zombie_list)
+        survivors = [human for human in self._human_list
+                     if human not in zombie_cells]
+        num_caught = len(self._human_list) - len(survivors)
+        self._human_list = survivors
+        return num_caught
+    
+    def num_reachable_humans(self):
+        """
+        Return the number of humans that some zombie can still reach.
+        Zombies never leave their four way component and humans never
+        leave their eight way component, so a human is out of reach
+        when no zombie shares its eight way component.
+        """
+        labels, dummy_sizes = self.component_labels(EIGHT_WAY)
+        zombie_labels = set([labels[self.cell_index(zombie[0], zombie[1])]
+                             for zombie in self._zombie_list])
+        return len([human for human in self._human_list
+                    if labels[self.cell_index(human[0], human[1])] in zombie_labels])
         
-        self._visited = poc_grid.Grid(self._grid_height, self._grid_width)
-        self._distance_field = []
-        self._distance_field = [ [self._grid_height * self._grid_width for dummy_col in range(self._grid_width)] for dummy_row in range(self._grid_height)]
-         
-        self._boundary = poc_queue.Queue()
+    def compute_distance_buffer(self, entity_type, metric = FOUR_WAY):
+        """
+        Compute the distance field for entity_type into its flat
+        buffer, which is reused from call to call.  Unreachable cells
+        and obstacles hold field_sentinel(metric).
         
+        metric is FOUR_WAY or EIGHT_WAY for unit steps, or OCTILE for
+        straight and diagonal steps weighted OCTILE_STRAIGHT and
+        OCTILE_DIAGONAL.
+        Returns the flat buffer, indexed by cell_index
+        """
         if entity_type == ZOMBIE:
-            for cell in self._zombie_list:
-                self._boundary.enqueue(cell)
+            sources = self._zombie_list
         elif entity_type == HUMAN:
-            for cell in self._human_list:
-                self._boundary.enqueue(cell)
-            
-        for cell in self._boundary:
-            self._visited.set_full(cell[0], cell[1])
-            self._distance_field[cell[0]][cell[1]] = 0
+            sources = self._human_list
+        else:
+            sources = []
+        
+        if (self._dynamic and entity_type in self._field_sources
+            and self._field_metrics[entity_type] == metric):
+            field = self.repair_distance_buffer(entity_type, sources)
+            if field != None:
+                return field
+        
+        sentinel = self.field_sentinel(metric)
+        if metric not in self._blank_fields:
+            self._blank_fields[metric] = [sentinel] * len(self._blocked)
+        if entity_type in self._distance_buffers:
+            field = self._distance_buffers[entity_type]
+            field[:] = self._blank_fields[metric]
+        else:
+            field = list(self._blank_fields[metric])
+            self._distance_buffers[entity_type] = field
+        self._field_metrics[entity_type] = metric
+        if metric != OCTILE:
+            labels, sizes = self.component_labels(metric)
+        
+        queue = self._queue
+        tail = 0
+        for cell in sources:
+            index = self.cell_index(cell[0], cell[1])
+            if field[index] != 0:
+                field[index] = 0
+                queue[tail] = index
+                tail += 1
+        
+        if metric == OCTILE:
+            self.relax_buckets(field, queue[:tail], metric)
+        else:
+            # Every cell reached so far is in the queue, so the search is
+            # done once the queue holds every cell of the components that
+            # contain a source.  The rest keep the sentinel from the fill.
+            blocked = self._blocked
+            source_labels = set([labels[queue[idx]] for idx in range(tail)])
+            if -1 in source_labels:
+                target = len(blocked)
+            else:
+                target = sum([sizes[label] for label in source_labels])
             
+            # Breadth first search with the queue held in a preallocated
+            # list; a cell is unvisited while it holds the sentinel
+            offsets = self._offsets[metric]
+            head = 0
+            while head < tail and tail < target:
+                index = queue[head]
+                head += 1
+                distance = field[index] + 1
+                for offset in offsets:
+                    neighbor = index + offset
+                    if field[neighbor] == sentinel and blocked[neighbor] == EMPTY:
+                        field[neighbor] = distance
+                        queue[tail] = neighbor
+                        tail += 1
+        
+        if self._dynamic:
+            self._field_sources[entity_type] = self.count_sources(sources)
+            self._field_edits[entity_type] = []
+        return field
+    
+    def component_labels(self, metric = FOUR_WAY):
+        """
+        Label the connected components of empty cells, with neighbors
+        given by metric.  The labeling is cached until an obstacle is
+        added or removed.
+        Returns a tuple of the label of each cell in the flat buffers,
+        -1 for obstacles and border cells, and the size of each
+        component
+        """
+        if metric == FOUR_WAY:
+            connectivity = FOUR_WAY
+        else:
+            connectivity = EIGHT_WAY
+        
+        if connectivity not in self._components:
+            blocked = self._blocked
+            offsets = self._offsets[connectivity]
+            queue = self._queue
+            labels = [-1] * len(blocked)
+            sizes = []
+            for start in range(len(blocked)):
+                if blocked[start] != EMPTY or labels[start] != -1:
+                    continue
+                label = len(sizes)
+                labels[start] = label
+                queue[0] = start
+                head = 0
+                tail = 1
+                while head < tail:
+                    index = queue[head]
+                    head += 1
+                    for offset in offsets:
+                        neighbor = index + offset
+                        if labels[neighbor] == -1 and blocked[neighbor] == EMPTY:
+                            labels[neighbor] = label
+                            queue[tail] = neighbor
+                            tail += 1
+                sizes.append(tail)
+            self._components[connectivity] = (labels, sizes)
+        return self._components[connectivity]
+    
+    def count_sources(self, sources):
+        """
+        Return a dictionary mapping the index of each source cell to
+        the number of sources in it
+        """
+        counts = {}
+        for cell in sources:
+            index = self.cell_index(cell[0], cell[1])
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+    
+    def repair_distance_buffer(self, entity_type, sources):
+        """
+        Update the stored distance field of entity_type after sources
+        were added, removed or moved and obstacles were edited.  Only
+        cells whose distance ran through a removed source or a new
+        obstacle are cleared, and the search is restarted from their
+        intact neighbors and from the new sources.
+        Returns the repaired flat buffer, or None when too many sources
+        moved or too much of the field was cleared for a repair to pay
+        off
+        """
+        field = self._distance_buffers[entity_type]
+        old_counts = self._field_sources[entity_type]
+        
+        # Give up as soon as too many sources are found in new cells,
+        # before doing any work that grows with the grid
+        limit = REPAIR_FRACTION * len(sources)
+        num_moved = 0
+        for cell in sources:
+            if self.cell_index(cell[0], cell[1]) not in old_counts:
+                num_moved += 1
+                if num_moved > limit:
+                    return None
+        
+        new_counts = self.count_sources(sources)
+        edits = self._field_edits[entity_type]
+        removed = [index for index in old_counts if index not in new_counts]
+        added = [index for index in new_counts if index not in old_counts]
+        self._field_sources[entity_type] = new_counts
+        self._field_edits[entity_type] = []
+        
+        metric = self._field_metrics[entity_type]
+        blocked = self._blocked
+        sentinel = self.field_sentinel(metric)
+        steps = zip(self._offsets[metric], self._costs[metric])
+        
+        # Clear every cell downhill of a removed source or new obstacle
+        raised = removed + [index for index in edits if blocked[index] != EMPTY]
+        stack = []
+        for index in raised:
+            if field[index] != sentinel and index not in new_counts:
+                stack.append((index, field[index]))
+                field[index] = sentinel
+        affected = []
+        max_affected = REPAIR_FRACTION * self._sentinel
+        while stack:
+            index, distance = stack.pop()
+            affected.append(index)
+            if len(affected) > max_affected:
+                return None
+            for offset, cost in steps:
+                neighbor = index + offset
+                if field[neighbor] == distance + cost and blocked[neighbor] == EMPTY:
+                    field[neighbor] = sentinel
+                    stack.append((neighbor, distance + cost))
+        
+        # Seed the search with the new sources and with the cleared or
+        # freed cells that border intact distances
+        seeds = []
+        for index in added:
+            field[index] = 0
+            seeds.append(index)
+        lowered = affected + [index for index in edits if blocked[index] == EMPTY]
+        for index in lowered:
+            if blocked[index] == EMPTY:
+                distance = field[index]
+                for offset, cost in steps:
+                    if field[index + offset] + cost < distance:
+                        distance = field[index + offset] + cost
+                if distance < field[index]:
+                    field[index] = distance
+                    seeds.append(index)
+        
+        self.relax_buckets(field, seeds, metric)
+        return field
+    
+    def relax_buckets(self, field, seeds, metric):
+        """
+        Lower the distances in field outward from the seed cells with
+        Dial's algorithm: cells are processed in order of distance from
+        one bucket per distance value, so integer step costs need no
+        heap.
+        """
+        buckets = {}
+        for index in seeds:
+            buckets.setdefault(field[index], []).append(index)
+        if not buckets:
+            return
+        
+        blocked = self._blocked
+        steps = zip(self._offsets[metric], self._costs[metric])
+        distance = min(buckets)
+        while buckets:
+            for index in buckets.pop(distance, []):
+                if field[index] != distance:
+                    continue
+                for offset, cost in steps:
+                    neighbor = index + offset
+                    if (blocked[neighbor] == EMPTY 
+                        and field[neighbor] > distance + cost):
+                        field[neighbor] = distance + cost
+                        buckets.setdefault(distance + cost, []).append(neighbor)
+            distance += 1
+        
+    def compute_distance_field(self, entity_type, metric = FOUR_WAY):
+        """
+        Function computes a 2D distance field
+        Distance at member of entity_queue is zero
+        Shortest paths avoid obstacles and use distance_type distances
+        """
+        field = self.compute_distance_buffer(entity_type, metric)
+        self._distance_field = []
         for row in range(self._grid_height):
-            for col in range(self._grid_width):
-                if self._cells[row][col] == FULL:
-                    self._visited.set_full(row, col)
-
-        while len(self._boundary) > 0:
-            current_cell = self._boundary.dequeue()
-
-            neighbors = self._visited.four_neighbors(current_cell[0], current_cell[1])
-            for neighbor in neighbors:
-                if self._visited.is_empty(neighbor[0], neighbor[1]):
-                    self._visited.set_full(neighbor[0], neighbor[1])
-                    self._distance_field[neighbor[0]][neighbor[1]] = self._distance_field[current_cell[0]][current_cell[1]] + 1
-                    self._boundary.enqueue(neighbor)
-                    
-                    
+            start = self.cell_index(row, 0)
+            self._distance_field.append(field[start:start + self._grid_width])
         return self._distance_field 
         
     def move_humans(self, zombie_distance):
@@ -205,6 +585,969 @@ class Zombie(poc_grid.Grid):
             random.shuffle(possible_best_move)
             best_moves.append(possible_best_move[0])
         self._zombie_list = best_moves
+    
+    def move_humans_batch(self):
+        """
+        Move every human away from the zombies in a single pass over
+        the flat zombie field left by compute_distance_buffer(ZOMBIE).
+        As in move_humans, each human takes the reachable cell among
+        its eight neighbors and itself that is farthest from the
+        zombies, with ties broken at random.
+        """
+        field = self._distance_buffers[ZOMBIE]
+        sentinel = self.field_sentinel(self._field_metrics[ZOMBIE])
+        self._human_list = self.select_moves(self._human_list, field,
+                                             self._offsets[EIGHT_WAY], 1, sentinel)
+    
+    def move_zombies_batch(self):
+        """
+        Move every zombie towards the humans in a single pass over the
+        flat human field left by compute_distance_buffer(HUMAN).  As in
+        move_zombies, each zombie takes the cell among its four
+        neighbors and itself that is closest to the humans, with ties
+        broken at random.
+        """
+        field = self._distance_buffers[HUMAN]
+        sentinel = self.field_sentinel(self._field_metrics[HUMAN])
+        self._zombie_list = self.select_moves(self._zombie_list, field,
+                                              self._offsets[FOUR_WAY], -1, sentinel + 1)
+    
+    def step(self, num_steps = 1, timings = None, recorder = None):
+        """
+        Advance the simulation num_steps steps without the GUI.  Each
+        step computes the zombie field, moves the humans, computes the
+        human field and moves the zombies.  If timings is given, the
+        seconds spent in each of STEP_PHASES are added to it.  If
+        recorder is given, the positions after each step are recorded
+        in it.
+        """
+        if timings != None:
+            for phase in STEP_PHASES:
+                timings.setdefault(phase, 0.0)
+        
+        for dummy_step in range(num_steps):
+            if timings == None:
+                self.compute_distance_buffer(ZOMBIE)
+                self.move_humans_batch()
+                self.compute_distance_buffer(HUMAN)
+                self.move_zombies_batch()
+            else:
+                start = time.time()
+                self.compute_distance_buffer(ZOMBIE)
+                lap = time.time()
+                timings[STEP_PHASES[0]] += lap - start
+                self.move_humans_batch()
+                start = time.time()
+                timings[STEP_PHASES[1]] += start - lap
+                self.compute_distance_buffer(HUMAN)
+                lap = time.time()
+                timings[STEP_PHASES[2]] += lap - start
+                self.move_zombies_batch()
+                timings[STEP_PHASES[3]] += time.time() - lap
+            if recorder != None:
+                recorder.record(self)
+    
+    def select_moves(self, cells, field, offsets, sign, limit):
+        """
+        Pick the move for each cell in cells among the cell itself and
+        its neighbors at the given offsets, skipping cells outside the
+        grid and cells whose distance in field is limit or more.  The
+        move maximizes sign * distance; every candidate also draws a
+        random key, and the largest key wins a tie.
+        Returns the list of new (row, col) positions
+        """
+        blocked = self._blocked
+        stride = self._stride
+        offsets = [0] + offsets
+        moves = []
+        for cell in cells:
+            index = (cell[0] + 1) * stride + cell[1] + 1
+            best_index = index
+            best_value = None
+            best_key = 0.0
+            for offset in offsets:
+                neighbor = index + offset
+                distance = field[neighbor]
+                if blocked[neighbor] == OUTSIDE or distance >= limit:
+                    continue
+                value = sign * distance
+                if best_value == None or value > best_value:
+                    best_index = neighbor
+                    best_value = value
+                    best_key = random.random()
+                elif value == best_value:
+                    key = random.random()
+                    if key > best_key:
+                        best_index = neighbor
+                        best_key = key
+            moves.append(best_index)
+        return [self.cell_position(index) for index in moves]
+
+class TiledGrid:
+    """
+    Compact obstacle grid for maps too large for lists of cells.
+    Obstacles are packed eight cells to a byte, row by row, in a
+    bytearray or in a memory mapped map file, and distance fields are
+    stored in square tiles of 16 bit values that are only allocated
+    once the search reaches them.
+    """
+
+    def __init__(self, grid_height, grid_width, obstacle_list = None,
+                 tile_size = TILE_SIZE, bits = None, offset = 0):
+        """
+        Create a grid of given size with given obstacles.  If bits is
+        given, it holds the packed obstacles from offset on, laid out
+        as dumps writes them, and may be a memory map.
+        """
+        self._grid_height = grid_height
+        self._grid_width = grid_width
+        self._tile_size = tile_size
+        self._tiles_across = (grid_width + tile_size - 1) / tile_size
+        self._row_bytes = (grid_width + 7) / 8
+        if bits == None:
+            bits = bytearray(grid_height * self._row_bytes)
+            offset = 0
+        self._bits = bits
+        self._offset = offset
+        if obstacle_list != None:
+            for cell in obstacle_list:
+                self.set_full(cell[0], cell[1])
+    
+    def get_grid_height(self):
+        """
+        Return the height of the grid
+        """
+        return self._grid_height
+    
+    def get_grid_width(self):
+        """
+        Return the width of the grid
+        """
+        return self._grid_width
+    
+    def byte_index(self, row, col):
+        """
+        Return the index in the packed obstacles of the byte holding
+        cell (row, col)
+        """
+        return self._offset + row * self._row_bytes + col / 8
+    
+    def set_empty(self, row, col):
+        """
+        Set cell (row, col) to be empty
+        """
+        index = self.byte_index(row, col)
+        byte = ord(self._bits[index:index + 1])
+        self._bits[index:index + 1] = chr(byte & ~(1 << (col % 8)))
+    
+    def set_full(self, row, col):
+        """
+        Set cell (row, col) to be an obstacle
+        """
+        index = self.byte_index(row, col)
+        byte = ord(self._bits[index:index + 1])
+        self._bits[index:index + 1] = chr(byte | 1 << (col % 8))
+    
+    def is_empty(self, row, col):
+        """
+        Return True if cell (row, col) is empty
+        """
+        index = self.byte_index(row, col)
+        return not (ord(self._bits[index:index + 1]) >> (col % 8)) & 1
+    
+    def tile_masks(self, tile_id):
+        """
+        Return the obstacles of tile tile_id as one integer of bits per
+        row of the tile.  Cells past the edge of the grid count as
+        obstacles.
+        """
+        size = self._tile_size
+        full = (1 << size) - 1
+        first_row = (tile_id / self._tiles_across) * size
+        first_col = (tile_id % self._tiles_across) * size
+        num_cols = min(size, self._grid_width - first_col)
+        low = first_col / 8
+        high = min((first_col + num_cols + 7) / 8, self._row_bytes)
+        
+        masks = []
+        for row in range(first_row, first_row + size):
+            if row >= self._grid_height:
+                masks.append(full)
+                continue
+            start = self._offset + row * self._row_bytes
+            word = 0
+            for byte in reversed(bytearray(self._bits[start + low:start + high])):
+                word = word << 8 | byte
+            word = (word >> (first_col % 8)) & full
+            masks.append(word | (full ^ ((1 << num_cols) - 1)))
+        return masks
+    
+    def dumps(self):
+        """
+        Return the grid as a string: a header line with the height,
+        width and tile size, then the packed obstacles
+        """
+        header = "%d %d %d\n" % (self._grid_height, self._grid_width,
+                                 self._tile_size)
+        return header + str(self._bits[self._offset:])
+    
+    def save(self, filename):
+        """
+        Write the grid to a map file that open_tiled_grid can map.
+        Local files are not available in CodeSkulptor, so this only
+        works in a desktop Python.
+        """
+        map_file = open(filename, "wb")
+        map_file.write(self.dumps())
+        map_file.close()
+    
+    def compute_distance_tiles(self, sources, max_tiles = TILE_CACHE):
+        """
+        Compute the four way distance field from the source cells,
+        keeping at most max_tiles of its tiles in memory.
+        The search runs one distance level at a time, with the
+        frontier grouped by tile so each tile is visited in one go.
+        Obstacles are unpacked a tile at a time as the search reaches
+        them, and at most max_tiles tiles of them are kept.
+        Returns a TiledField
+        Raises ValueError if a reachable cell is too far away for the
+        16 bit tiles of the field to hold its distance
+        """
+        height = self._grid_height
+        width = self._grid_width
+        size = self._tile_size
+        tiles_across = self._tiles_across
+        field = TiledField(height, width, size,
+                           min(height * width, TILED_SENTINEL), max_tiles)
+        sentinel = field.get_sentinel()
+        masks = {}
+        
+        frontier = {}
+        for cell in sources:
+            tile_id = field.tile_id(cell[0], cell[1])
+            tile = field.tile(tile_id)
+            index = field.local_index(cell[0], cell[1])
+            if tile[index] != 0:
+                tile[index] = 0
+                frontier.setdefault(tile_id, []).append(cell)
+        
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = {}
+            tile_id = None
+            for cells in frontier.values():
+                for row, col in cells:
+                    for nrow, ncol in ((row - 1, col), (row + 1, col),
+                                       (row, col - 1), (row, col + 1)):
+                        if nrow < 0 or nrow >= height or ncol < 0 or ncol >= width:
+                            continue
+                        # Most neighbors share the tile of the last one
+                        neighbor_tile_id = (nrow / size) * tiles_across + ncol / size
+                        if neighbor_tile_id != tile_id:
+                            tile_id = neighbor_tile_id
+                            tile = field.tile(tile_id)
+                            if tile_id not in masks:
+                                if len(masks) >= max_tiles:
+                                    masks.clear()
+                                masks[tile_id] = self.tile_masks(tile_id)
+                            blocked_rows = masks[tile_id]
+                            next_cells = next_frontier.setdefault(tile_id, [])
+                        bit = ncol % size
+                        if (blocked_rows[nrow % size] >> bit) & 1:
+                            continue
+                        index = (nrow % size) * size + bit
+                        if tile[index] > distance:
+                            tile[index] = distance
+                            next_cells.append((nrow, ncol))
+                        elif tile[index] == sentinel:
+                            raise ValueError("cell (%d, %d) is more than %d steps "
+                                             "from the sources" % (nrow, ncol, sentinel - 1))
+            frontier = next_frontier
+        return field
+
+
+def load_tiled_grid(data):
+    """
+    Rebuild a TiledGrid from the string returned by its dumps method
+    """
+    header, bits = data.split("\n", 1)
+    grid_height, grid_width, tile_size = [int(val) for val in header.split()]
+    return TiledGrid(grid_height, grid_width, None, tile_size, bytearray(bits))
+
+
+def open_tiled_grid(filename):
+    """
+    Open a map file written by TiledGrid.save without reading it: the
+    obstacles are memory mapped, and edits stay in memory.  Memory
+    maps are not available in CodeSkulptor, so this only works in a
+    desktop Python.
+    """
+    import mmap
+    map_file = open(filename, "rb")
+    header = map_file.readline()
+    bits = mmap.mmap(map_file.fileno(), 0, access = mmap.ACCESS_COPY)
+    map_file.close()
+    grid_height, grid_width, tile_size = [int(val) for val in header.split()]
+    return TiledGrid(grid_height, grid_width, None, tile_size, bits, len(header))
+
+
+class TiledField:
+    """
+    Distance field stored as square tiles of unsigned 16 bit values.
+    Tiles that were never allocated hold the sentinel everywhere.  At
+    most max_tiles tiles are kept in memory; the least recently used
+    ones are spilled to a temporary file and read back when needed,
+    so memory stays bounded however much of the grid is reached.
+    """
+
+    def __init__(self, grid_height, grid_width, tile_size, sentinel,
+                 max_tiles = TILE_CACHE):
+        """
+        Create a field with every cell at the sentinel.  Arrays and
+        temporary files are not available in CodeSkulptor, so this
+        only works in a desktop Python.
+        """
+        import array
+        import collections
+        self._grid_height = grid_height
+        self._grid_width = grid_width
+        self._tile_size = tile_size
+        self._tiles_across = (grid_width + tile_size - 1) / tile_size
+        self._sentinel = sentinel
+        self._blank = array.array("H", [sentinel]) * (tile_size ** 2)
+        self._tile_bytes = len(self._blank.tostring())
+        self._max_tiles = max(max_tiles, 1)
+        self._tiles = collections.OrderedDict()
+        self._num_tiles = 0
+        self._spill = None
+        self._slots = {}
+    
+    def get_sentinel(self):
+        """
+        Return the distance held by unreached cells and obstacles
+        """
+        return self._sentinel
+    
+    def tile_id(self, row, col):
+        """
+        Return the id of the tile holding cell (row, col)
+        """
+        return ((row / self._tile_size) * self._tiles_across 
+                + col / self._tile_size)
+    
+    def local_index(self, row, col):
+        """
+        Return the index of cell (row, col) inside its tile
+        """
+        return (row % self._tile_size) * self._tile_size + col % self._tile_size
+    
+    def tile(self, tile_id):
+        """
+        Return the values of tile tile_id, allocating it or reading it
+        back from the spill file if needed.  The tile returned stays
+        valid for writing until the next call.
+        """
+        tile = self._tiles.pop(tile_id, None)
+        if tile == None:
+            if tile_id in self._slots:
+                tile = self._blank[:0]
+                self._spill.seek(self._slots[tile_id] * self._tile_bytes)
+                tile.fromstring(self._spill.read(self._tile_bytes))
+            else:
+                tile = self._blank[:]
+                self._num_tiles += 1
+            if len(self._tiles) >= self._max_tiles:
+                self.spill_tile()
+        self._tiles[tile_id] = tile
+        return tile
+    
+    def spill_tile(self):
+        """
+        Write the least recently used tile in memory to the spill file
+        and drop it from memory
+        """
+        tile_id, tile = self._tiles.popitem(False)
+        if self._spill == None:
+            import tempfile
+            self._spill = tempfile.TemporaryFile("w+b")
+        if tile_id not in self._slots:
+            self._slots[tile_id] = len(self._slots)
+        self._spill.seek(self._slots[tile_id] * self._tile_bytes)
+        self._spill.write(tile.tostring())
+    
+    def num_tiles(self):
+        """
+        Return the number of tiles allocated so far
+        """
+        return self._num_tiles
+    
+    def num_resident_tiles(self):
+        """
+        Return the number of tiles held in memory
+        """
+        return len(self._tiles)
+    
+    def get(self, row, col):
+        """
+        Return the distance at cell (row, col)
+        """
+        tile_id = self.tile_id(row, col)
+        if tile_id in self._tiles:
+            return self._tiles[tile_id][self.local_index(row, col)]
+        if tile_id not in self._slots:
+            return self._sentinel
+        return self.tile(tile_id)[self.local_index(row, col)]
+    
+    def __getitem__(self, row):
+        """
+        Return a view of row row of the field, so the field can be
+        indexed as field[row][col] like the lists from
+        compute_distance_field
+        """
+        return TiledRow(self, row)
+    
+    def to_lists(self):
+        """
+        Return the field as a list of rows, as compute_distance_field
+        does
+        """
+        return [[self.get(row, col) for col in range(self._grid_width)]
+                for row in range(self._grid_height)]
+
+
+class TiledRow:
+    """
+    View of one row of a TiledField that reads cells on demand
+    """
+
+    def __init__(self, field, row):
+        """
+        Create a view of row row of field
+        """
+        self._field = field
+        self._row = row
+    
+    def __getitem__(self, col):
+        """
+        Return the distance at column col of the row
+        """
+        return self._field.get(self._row, col)
+
+
+class TiledZombie(TiledGrid):
+    """
+    Zombie simulation on a TiledGrid, for maps too large for the
+    Zombie class.  Distance fields are four way TiledFields, and the
+    moves follow the same rules as Zombie.
+    """
+
+    def __init__(self, grid_height, grid_width, obstacle_list = None,
+                 zombie_list = None, human_list = None,
+                 tile_size = TILE_SIZE, bits = None, offset = 0):
+        """
+        Create a simulation of given size with given obstacles,
+        humans, and zombies
+        """
+        TiledGrid.__init__(self, grid_height, grid_width, obstacle_list,
+                           tile_size, bits, offset)
+        if zombie_list != None:
+            self._zombie_list = list(zombie_list)
+        else:
+            self._zombie_list = []
+        if human_list != None:
+            self._human_list = list(human_list)
+        else:
+            self._human_list = []
+        self._fields = {}
+    
+    def clear(self):
+        """
+        Set cells in obstacle grid to be empty
+        Reset zombie and human lists to be empty
+        """
+        self._bits = bytearray(self._grid_height * self._row_bytes)
+        self._offset = 0
+        self._zombie_list = []
+        self._human_list = []
+        self._fields = {}
+    
+    def add_zombie(self, row, col):
+        """
+        Add zombie to the zombie list
+        """
+        self._zombie_list.append((row, col))
+    
+    def num_zombies(self):
+        """
+        Return number of zombies
+        """
+        return len(self._zombie_list)
+    
+    def zombies(self):
+        """
+        Generator that yields the zombies in the order they were
+        added.
+        """
+        for zombie in self._zombie_list:
+            yield zombie
+    
+    def add_human(self, row, col):
+        """
+        Add human to the human list
+        """
+        self._human_list.append((row, col))
+    
+    def num_humans(self):
+        """
+        Return number of humans
+        """
+        return len(self._human_list)
+    
+    def humans(self):
+        """
+        Generator that yields the humans in the order they were added.
+        """
+        for human in self._human_list:
+            yield human
+    
+    def compute_distance_field(self, entity_type):
+        """
+        Compute the four way distance field of entity_type
+        Returns a TiledField, which can be indexed as field[row][col]
+        """
+        if entity_type == ZOMBIE:
+            sources = self._zombie_list
+        elif entity_type == HUMAN:
+            sources = self._human_list
+        else:
+            sources = []
+        self._fields[entity_type] = self.compute_distance_tiles(sources)
+        return self._fields[entity_type]
+    
+    def move_humans(self, zombie_distance):
+        """
+        Move humans away from zombies, diagonal moves are allowed
+        """
+        self._human_list = self.select_tiled_moves(
+            self._human_list, zombie_distance, True, 1,
+            zombie_distance.get_sentinel())
+    
+    def move_zombies(self, human_distance):
+        """
+        Move zombies towards humans, no diagonal moves are allowed
+        """
+        self._zombie_list = self.select_tiled_moves(
+            self._zombie_list, human_distance, False, -1,
+            human_distance.get_sentinel() + 1)
+    
+    def step(self, num_steps = 1):
+        """
+        Advance the simulation num_steps steps without the GUI, in the
+        same order as Zombie.step
+        """
+        for dummy_step in range(num_steps):
+            self.move_humans(self.compute_distance_field(ZOMBIE))
+            self.move_zombies(self.compute_distance_field(HUMAN))
+    
+    def select_tiled_moves(self, cells, field, diagonal, sign, limit):
+        """
+        Pick the move for each cell in cells as Zombie.select_moves
+        does, among the cell itself and its four neighbors, or eight
+        if diagonal is True, reading distances from a TiledField.
+        Returns the list of new (row, col) positions
+        """
+        steps = [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+        if diagonal:
+            steps += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+        moves = []
+        for row, col in cells:
+            best_move = (row, col)
+            best_value = None
+            best_key = 0.0
+            for drow, dcol in steps:
+                nrow = row + drow
+                ncol = col + dcol
+                if (nrow < 0 or nrow >= self._grid_height 
+                    or ncol < 0 or ncol >= self._grid_width):
+                    continue
+                distance = field.get(nrow, ncol)
+                if distance >= limit:
+                    continue
+                value = sign * distance
+                if best_value == None or value > best_value:
+                    best_move = (nrow, ncol)
+                    best_value = value
+                    best_key = random.random()
+                elif value == best_value:
+                    key = random.random()
+                    if key > best_key:
+                        best_move = (nrow, ncol)
+                        best_key = key
+            moves.append(best_move)
+        return moves
+
+
+class TrajectoryRecorder:
+    """
+    Record of every human and zombie position at every step.  Each
+    position is packed as a pair of 16 bit integers, row then col,
+    into array buffers, and frames are grouped into chunks of
+    FRAMES_PER_CHUNK frames.  With a sink file, each completed chunk
+    is written to it in binary and dropped from memory, and reading a
+    frame back reads only the chunk that holds it.  Arrays are not
+    available in CodeSkulptor, so this only works in a desktop Python.
+    """
+
+    def __init__(self, grid_height, grid_width, obstacle_list, sink = None,
+                 frames_per_chunk = FRAMES_PER_CHUNK, chunks = None):
+        """
+        Create an empty recording of a simulation of given size with
+        given obstacles.  sink may be a binary file open for reading
+        and writing.  chunks, if given, lists the (byte offset, number
+        of frames) of the chunks already in sink, as load_trajectory
+        finds them, and the header is then not written again.
+        """
+        import array
+        if max(grid_height, grid_width) > 1 << 15:
+            raise ValueError("grid too large for 16 bit positions")
+        self._array = array.array
+        self._grid_height = grid_height
+        self._grid_width = grid_width
+        self._obstacles = self._array("h", [coord for cell in obstacle_list
+                                            for coord in cell])
+        self._sink = sink
+        self._frames_per_chunk = frames_per_chunk
+        self._chunks = []
+        self._chunk_steps = []
+        self._chunk_offsets = []
+        self._num_frames = 0
+        self.new_chunk()
+        
+        if chunks != None:
+            for offset, num_frames in chunks:
+                self._chunk_steps.append(self._num_frames)
+                self._chunk_offsets.append(offset)
+                self._num_frames += num_frames
+        elif sink != None:
+            header = self._array("i", [grid_height, grid_width, len(obstacle_list)])
+            sink.write(header.tostring())
+            sink.write(self._obstacles.tostring())
+    
+    def new_chunk(self):
+        """
+        Start empty buffers for the next chunk: the start of each
+        frame in the positions, the number of humans in each frame and
+        the positions
+        """
+        self._starts = self._array("i")
+        self._humans = self._array("i")
+        self._cells = self._array("h")
+    
+    def num_frames(self):
+        """
+        Return the number of frames recorded
+        """
+        return self._num_frames
+    
+    def record(self, zombie):
+        """
+        Append the current positions of the humans and zombies
+        """
+        self.record_frame(list(zombie.humans()), list(zombie.zombies()))
+    
+    def record_frame(self, human_list, zombie_list):
+        """
+        Append a frame with the given human and zombie positions
+        """
+        if not self._starts:
+            self._chunk_steps.append(self._num_frames)
+        self._starts.append(len(self._cells) / 2)
+        self._humans.append(len(human_list))
+        self._cells.extend([coord for cell in human_list for coord in cell])
+        self._cells.extend([coord for cell in zombie_list for coord in cell])
+        self._num_frames += 1
+        if len(self._starts) == self._frames_per_chunk:
+            self.flush()
+    
+    def flush(self):
+        """
+        Close the current chunk.  With a sink, the chunk is appended to
+        it as a header with its number of frames and positions followed
+        by its three buffers, and only its byte offset is kept;
+        otherwise the buffers are kept in memory.
+        """
+        if not self._starts:
+            return
+        if self._sink == None:
+            self._chunks.append((self._starts, self._humans, self._cells))
+        else:
+            self._sink.seek(0, 2)
+            self._chunk_offsets.append(self._sink.tell())
+            header = self._array("i", [len(self._starts), len(self._cells) / 2])
+            for buf in (header, self._starts, self._humans, self._cells):
+                self._sink.write(buf.tostring())
+        self.new_chunk()
+    
+    def read_chunk(self, chunk):
+        """
+        Return the starts, human counts and positions of chunk number
+        chunk, reading them from the sink if it was written there
+        """
+        if self._sink == None:
+            return self._chunks[chunk]
+        if chunk == len(self._chunk_offsets):
+            return self._starts, self._humans, self._cells
+        self._sink.seek(self._chunk_offsets[chunk])
+        header = self.read_array("i", 2)
+        starts = self.read_array("i", header[0])
+        humans = self.read_array("i", header[0])
+        cells = self.read_array("h", 2 * header[1])
+        return starts, humans, cells
+    
+    def read_array(self, typecode, length):
+        """
+        Read an array of length values of typecode from the sink
+        """
+        values = self._array(typecode)
+        values.fromstring(self._sink.read(length * values.itemsize))
+        return values
+    
+    def frame(self, step):
+        """
+        Return the human and zombie lists recorded at step
+        """
+        if step < 0 or step >= self._num_frames:
+            raise IndexError("no frame recorded at step %d" % step)
+        chunk = len(self._chunk_steps) - 1
+        while self._chunk_steps[chunk] > step:
+            chunk -= 1
+        if chunk == len(self._chunk_steps) - 1 and self._starts:
+            starts, humans, cells = self._starts, self._humans, self._cells
+        else:
+            starts, humans, cells = self.read_chunk(chunk)
+        
+        local = step - self._chunk_steps[chunk]
+        start = 2 * starts[local]
+        if local + 1 < len(starts):
+            end = 2 * starts[local + 1]
+        else:
+            end = len(cells)
+        coords = cells[start:end]
+        positions = zip(coords[0::2], coords[1::2])
+        return positions[:humans[local]], positions[humans[local]:]
+    
+    def seek(self, step):
+        """
+        Return a new simulation with the obstacles and the positions
+        recorded at step
+        """
+        human_list, zombie_list = self.frame(step)
+        coords = self._obstacles
+        obstacle_list = zip(coords[0::2], coords[1::2])
+        return Zombie(self._grid_height, self._grid_width, obstacle_list,
+                      zombie_list, human_list)
+
+
+def record_trajectory(zombie, sink = None):
+    """
+    Start recording zombie, with its current positions as frame 0
+    Returns a TrajectoryRecorder to pass to zombie.step
+    """
+    obstacle_list = []
+    for row in range(zombie.get_grid_height()):
+        for col in range(zombie.get_grid_width()):
+            if not zombie.is_empty(row, col):
+                obstacle_list.append((row, col))
+    recorder = TrajectoryRecorder(zombie.get_grid_height(), zombie.get_grid_width(),
+                                  obstacle_list, sink)
+    recorder.record(zombie)
+    return recorder
+
+
+def load_trajectory(source):
+    """
+    Reopen a recording from the binary file its sink was, which must
+    be open for reading.  Only the header and the chunk headers are
+    read; frames are read from the file when they are asked for.
+    """
+    import array
+    header = array.array("i")
+    header.fromstring(source.read(3 * header.itemsize))
+    grid_height, grid_width, num_obstacles = header
+    coords = array.array("h")
+    coords.fromstring(source.read(2 * num_obstacles * coords.itemsize))
+    
+    chunks = []
+    while True:
+        offset = source.tell()
+        chunk_header = array.array("i")
+        data = source.read(2 * chunk_header.itemsize)
+        if len(data) < 2 * chunk_header.itemsize:
+            break
+        chunk_header.fromstring(data)
+        num_frames, num_cells = chunk_header
+        chunks.append((offset, num_frames))
+        source.seek(2 * num_frames * chunk_header.itemsize 
+                    + 2 * num_cells * coords.itemsize, 1)
+    return TrajectoryRecorder(grid_height, grid_width,
+                              zip(coords[0::2], coords[1::2]), source,
+                              FRAMES_PER_CHUNK, chunks)
+
+
+def scenario_lists(grid_height, grid_width, density, population, seed = None):
+    """
+    Draw a random scenario whose cells are obstacles with probability
+    density, with population zombies and population humans placed on
+    random free cells.  The scenario is drawn from its own random
+    generator, seeded with seed if it is given so the scenario can be
+    drawn again, and the state of the random module is left alone.
+    Returns a tuple of the obstacle, zombie and human lists
+    """
+    rng = random.Random(seed)
+    obstacle_list = []
+    free_cells = []
+    for row in range(grid_height):
+        for col in range(grid_width):
+            if rng.random() < density:
+                obstacle_list.append((row, col))
+            else:
+                free_cells.append((row, col))
+    
+    zombie_list = []
+    human_list = []
+    if free_cells:
+        for dummy_idx in range(population):
+            zombie_list.append(rng.choice(free_cells))
+            human_list.append(rng.choice(free_cells))
+    return obstacle_list, zombie_list, human_list
+
+
+def random_scenario(grid_height, grid_width, density, population, seed = None):
+    """
+    Build a simulation from scenario_lists
+    """
+    obstacle_list, zombie_list, human_list = scenario_lists(
+        grid_height, grid_width, density, population, seed)
+    return Zombie(grid_height, grid_width, obstacle_list, zombie_list, human_list)
+
+
+def run_scenario(zombie, max_steps = SCENARIO_STEPS):
+    """
+    Step the simulation until every human is caught, no zombie can
+    reach the humans left, or max_steps steps have run.  A human is
+    caught when a zombie ends a step on its cell.
+    Returns a dictionary with the number of steps survived, the step
+    at which each human was caught, the number of survivors and the
+    wall time in seconds
+    """
+    start = time.time()
+    catch_times = [0] * zombie.remove_caught_humans()
+    steps = 0
+    while (steps < max_steps and zombie.num_humans() > 0 
+           and zombie.num_reachable_humans() > 0):
+        zombie.step()
+        steps += 1
+        catch_times.extend([steps] * zombie.remove_caught_humans())
+    return {"steps_survived": steps,
+            "catch_times": catch_times,
+            "survivors": zombie.num_humans(),
+            "wall_time": time.time() - start}
+
+
+def run_scenarios(seeds, grid_height, grid_width, density, population,
+                  max_steps = SCENARIO_STEPS, processes = None):
+    """
+    Generator that plays the scenario drawn from each seed with
+    run_scenario and yields its summary, tagged with the seed, in the
+    order of seeds.  One simulation is reused for every scenario, so
+    the flat buffers are allocated only once.
+    
+    If processes is given, the scenarios are shared out to a pool of
+    that many processes, each reusing one simulation of its own.
+    Process pools are not available in CodeSkulptor, so this only
+    works in a desktop Python.
+    """
+    tasks = [(seed, grid_height, grid_width, density, population, max_steps)
+             for seed in seeds]
+    if processes == None:
+        init_scenario_worker(grid_height, grid_width)
+        for task in tasks:
+            yield play_scenario(task)
+        return
+    
+    import multiprocessing
+    pool = multiprocessing.Pool(processes, init_scenario_worker,
+                                (grid_height, grid_width, True))
+    try:
+        for summary in pool.imap(play_scenario, tasks):
+            yield summary
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def init_scenario_worker(grid_height, grid_width, reseed = False):
+    """
+    Set up the simulation that run_scenarios reuses in this process.
+    If reseed is True, the random module is reseeded too, so that pool
+    processes forked from the same parent do not break ties alike.
+    """
+    if reseed:
+        random.seed()
+    SCENARIO_WORKER["zombie"] = Zombie(grid_height, grid_width)
+
+
+def play_scenario(task):
+    """
+    Play one scenario for run_scenarios on the simulation of this
+    process.  task is a tuple of the seed, the grid height and width,
+    the density, the population and the step cap.
+    Returns the summary from run_scenario, tagged with the seed
+    """
+    seed, grid_height, grid_width, density, population, max_steps = task
+    zombie = SCENARIO_WORKER["zombie"]
+    obstacle_list, zombie_list, human_list = scenario_lists(
+        grid_height, grid_width, density, population, seed)
+    zombie.reset_scenario(obstacle_list, zombie_list, human_list)
+    summary = run_scenario(zombie, max_steps)
+    summary["seed"] = seed
+    return summary
+
+
+def run_benchmarks(sizes = BENCHMARK_SIZES, densities = BENCHMARK_DENSITIES,
+                   populations = BENCHMARK_POPULATIONS,
+                   num_steps = BENCHMARK_STEPS):
+    """
+    Time num_steps headless steps for every combination of grid size,
+    obstacle density and population, printing one line per run.
+    Returns a list of dictionaries with the configuration, the steps
+    per second and the seconds spent in each of STEP_PHASES
+    """
+    results = []
+    for grid_height, grid_width in sizes:
+        for density in densities:
+            for population in populations:
+                zombie = random_scenario(grid_height, grid_width,
+                                         density, population)
+                timings = {}
+                zombie.step(num_steps, timings)
+                total = sum(timings.values())
+                steps_per_sec = num_steps / max(total, 1e-9)
+                
+                result = {"size": (grid_height, grid_width),
+                          "density": density,
+                          "population": population,
+                          "steps_per_sec": steps_per_sec}
+                result.update(timings)
+                results.append(result)
+                
+                phases = ", ".join(["%s %.4fs" % (phase, timings[phase])
+                                    for phase in STEP_PHASES])
+                print "%dx%d density %.2f population %d: %.1f steps/sec (%s)" % (
+                    grid_height, grid_width, density, population,
+                    steps_per_sec, phases)
+    return results
 
 # start up gui for simulation
 poc_zombie_gui.run_gui(Zombie(30, 40))
@@ -231,4 +1574,9 @@ poc_zombie_gui.run_gui(Zombie(30, 40))
 
 #print zombie2.compute_distance_field(ZOMBIE)
 
-#print "zombies at: ", zombie2._zombie_list 
+#print "zombies at: ", zombie2._zombie_list
+
+#run_benchmarks()
+
+#for summary in run_scenarios(range(10), 30, 40, 0.2, 5):
+#    print summary 
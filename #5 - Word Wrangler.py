@@ -3,12 +3,44 @@ Student code for Word Wrangler game
 """
 
 import urllib2
+import random
+import time
 import codeskulptor
 import poc_wrangler_provided as provided
-import math
 
 WORDFILE = "assets_scrabble_words3.txt"
 
+# Compiled word tables, keyed by the name of the file they were read from
+WORD_TABLES = {}
+
+# Suffix of the compiled table file written next to a word file, and
+# the width and format of its hexadecimal fields
+COMPILED_SUFFIX = ".table"
+FIELD_WIDTH = 8
+FIELD_FORMAT = "%08x"
+
+# Words sorted in memory per run by iter_external_sort
+EXTERNAL_CHUNK = 100000
+
+# Intersections gallop through the longer list when it is more than
+# this many times longer than the shorter one
+GALLOP_RATIO = 8
+
+# Dictionary sizes and seed word lengths swept by run_benchmarks.
+# gen_all_strings is only timed up to GEN_ALL_MAX letters, since its
+# output grows factorially; longer seeds are timed through find_words.
+BENCHMARK_SIZES = [10000, 100000, 1000000]
+BENCHMARK_SEED_LENGTHS = [5, 8, 12]
+GEN_ALL_MAX = 8
+
+# Each benchmark timing is the best of BENCHMARK_REPEATS runs, and each
+# run makes enough calls to last at least BENCHMARK_MIN_TIME seconds
+BENCHMARK_REPEATS = 5
+BENCHMARK_MIN_TIME = 0.2
+
+# Timings more than this factor above the baseline count as regressions
+REGRESSION_FACTOR = 1.25
+
 # Functions to manipulate ordered word lists
 
 def remove_duplicates(list1):
@@ -42,11 +74,100 @@ def intersect(list1, list2):
 
     This function can be iterative.
     """
-    result = []
+    return list(iter_intersect(list1, list2))
+
+def iter_intersect(list1, list2):
+    """
+    Generator that yields each element that is in both sorted lists
+    once, in sorted order.  Lists of similar length are walked side by
+    side; a much shorter list is matched by galloping through the
+    longer one.  Either list may instead be a Dawg, in which case the
+    other list is checked word by word against it.
+    """
+    if isinstance(list1, Dawg):
+        list1, list2 = list2, list1
+    if isinstance(list2, Dawg):
+        for val in remove_duplicates(list1):
+            if val in list2:
+                yield val
+        return
     
-    list1 = remove_duplicates(list1)
-    list2 = remove_duplicates(list2)
-    result = [val for val in list1 if val in list2]
+    if len(list2) < len(list1):
+        list1, list2 = list2, list1
+    if len(list1) * GALLOP_RATIO < len(list2):
+        for val in iter_gallop_intersect(list1, list2):
+            yield val
+        return
+    
+    idx1 = 0
+    idx2 = 0
+    found = False
+    last = None
+    while idx1 < len(list1) and idx2 < len(list2):
+        val1 = list1[idx1]
+        val2 = list2[idx2]
+        if val1 < val2:
+            idx1 += 1
+        elif val2 < val1:
+            idx2 += 1
+        else:
+            if not found or last != val1:
+                yield val1
+                found = True
+                last = val1
+            idx1 += 1
+            idx2 += 1
+
+def iter_gallop_intersect(small, large):
+    """
+    Generator that yields each element of the sorted list small that
+    is also in the sorted list large, once, in sorted order.  Each
+    element is located with an exponential search from the position of
+    the previous one, so the cost grows with len(small) * log(len(large)).
+    """
+    size = len(large)
+    low = 0
+    for idx in range(len(small)):
+        val = small[idx]
+        if idx > 0 and small[idx - 1] == val:
+            continue
+        
+        # Every element before low is smaller than val; double the step
+        # until an element at least as large as val is passed
+        step = 1
+        high = low
+        while high < size and large[high] < val:
+            low = high + 1
+            high += step
+            step *= 2
+        high = min(high, size)
+        
+        while low < high:
+            mid = (low + high) / 2
+            if large[mid] < val:
+                low = mid + 1
+            else:
+                high = mid
+        if low == size:
+            return
+        if large[low] == val:
+            yield val
+
+def intersect_all(lists):
+    """
+    Compute the intersection of any number of sorted lists, starting
+    from the shortest so the running result stays small.
+
+    Returns a new sorted list of the elements in every list.
+    """
+    if not lists:
+        return []
+    ordered = sorted(lists, key = len)
+    result = remove_duplicates(ordered[0])
+    for other in ordered[1:]:
+        if not result:
+            break
+        result = intersect(result, other)
     return result
 
 # Functions to perform merge sort
@@ -61,19 +182,34 @@ def merge(list1, list2):
     This function can be iterative.
     """   
     result = []
-    list1_copy = []
-    list2_copy = []
-    for idx in range(len(list1)):
-        list1_copy.append(list1[idx])
-    for idy in range(len(list2)):
-        list2_copy.append(list2[idy])
+    idx1 = 0
+    idx2 = 0
+    while idx1 < len(list1) and idx2 < len(list2):
+        if list2[idx2] < list1[idx1]:
+            result.append(list2[idx2])
+            idx2 += 1
+        else:
+            result.append(list1[idx1])
+            idx1 += 1
+    result.extend(list1[idx1:])
+    result.extend(list2[idx2:])
+    return result
 
-    while list1_copy and list2_copy:
-        if list1_copy[0] < list2_copy[0]:
-            result.append(list1_copy.pop(0))
+def merge_runs(source, target, low, mid, high):
+    """
+    Merge the sorted runs source[low:mid] and source[mid:high] into
+    target[low:high].  Ties are taken from the first run, so the
+    merge is stable.
+    """
+    idx1 = low
+    idx2 = mid
+    for idx in range(low, high):
+        if idx2 >= high or (idx1 < mid and not source[idx2] < source[idx1]):
+            target[idx] = source[idx1]
+            idx1 += 1
         else:
-            result.append(list2_copy.pop(0))
-    return result + list1_copy + list2_copy
+            target[idx] = source[idx2]
+            idx2 += 1
                 
 def merge_sort(list1):
     """
@@ -81,23 +217,143 @@ def merge_sort(list1):
 
     Return a new sorted list with the same elements as list1.
 
-    This function should be recursive.
+    The sort is a stable bottom-up merge sort.  It starts from the
+    runs that are already in order, so a sorted list is returned after
+    a single pass, and merges pairs of runs back and forth between
+    two buffers until one run is left.
     """
-    if (len(list1) == 1 or len(list1) == 0):
-        return list1
-    length = len(list1)
-    mid = int(math.floor(length/2))
-    first = []
-    second = []
-    for idx in range(mid):
-        first.append(list1[idx])
-    for idy in range(mid, length):
-        second.append(list1[idy])
-    sorted_first = merge_sort(first)
-    sorted_second = merge_sort(second)
-    result = merge(sorted_first, sorted_second) 
+    source = list(list1)
+    length = len(source)
     
-    return result
+    bounds = [0]
+    for idx in range(1, length):
+        if source[idx] < source[idx - 1]:
+            bounds.append(idx)
+    bounds.append(length)
+    if len(bounds) <= 2:
+        return source
+    
+    target = [None] * length
+    while len(bounds) > 2:
+        new_bounds = [0]
+        for pos in range(0, len(bounds) - 1, 2):
+            low = bounds[pos]
+            if pos + 2 < len(bounds):
+                high = bounds[pos + 2]
+                merge_runs(source, target, low, bounds[pos + 1], high)
+            else:
+                high = bounds[pos + 1]
+                target[low:high] = source[low:high]
+            new_bounds.append(high)
+        source, target = target, source
+        bounds = new_bounds
+    return source
+
+# Functions to sort word lists larger than memory
+
+def iter_merge(iter1, iter2):
+    """
+    Generator that merges two sorted iterables, taking ties from the
+    first one.
+    """
+    iter1 = iter(iter1)
+    iter2 = iter(iter2)
+    sentinel = object()
+    val1 = next(iter1, sentinel)
+    val2 = next(iter2, sentinel)
+    while val1 is not sentinel and val2 is not sentinel:
+        if val2 < val1:
+            yield val2
+            val2 = next(iter2, sentinel)
+        else:
+            yield val1
+            val1 = next(iter1, sentinel)
+    while val1 is not sentinel:
+        yield val1
+        val1 = next(iter1, sentinel)
+    while val2 is not sentinel:
+        yield val2
+        val2 = next(iter2, sentinel)
+
+def iter_merge_all(iters):
+    """
+    Generator that merges any number of sorted iterables through a
+    balanced tree of two way merges, so each element takes part in
+    about log(len(iters)) comparisons.
+    """
+    if not iters:
+        return iter([])
+    if len(iters) == 1:
+        return iter(iters[0])
+    mid = len(iters) / 2
+    return iter_merge(iter_merge_all(iters[:mid]), iter_merge_all(iters[mid:]))
+
+def iter_remove_duplicates(words):
+    """
+    Generator that yields the words of a sorted iterable, skipping
+    repeats, as remove_duplicates does for a list.
+    """
+    found = False
+    prev_word = None
+    for word in words:
+        if not found or word != prev_word:
+            yield word
+            found = True
+            prev_word = word
+
+def open_temp_run():
+    """
+    Return a new temporary file to hold one sorted run.  Temporary
+    files are not available in CodeSkulptor, so this only works in a
+    desktop Python.
+    """
+    import tempfile
+    return tempfile.TemporaryFile("w+")
+
+def iter_run(run_file):
+    """
+    Generator that yields the words in a run file, one per line
+    """
+    run_file.seek(0)
+    for line in run_file:
+        yield line[:-1]
+
+def iter_external_sort(words, chunk_size = EXTERNAL_CHUNK,
+                       open_run = open_temp_run):
+    """
+    Generator that yields the distinct words of any iterable in sorted
+    order while holding at most chunk_size of them in memory.  Each
+    chunk is sorted with merge_sort and written to its own run file,
+    one word per line; the runs are then read back in order, merged
+    and stripped of duplicates.
+
+    open_run is called to get each run file, which must support
+    write, seek and line iteration.
+    """
+    runs = []
+    chunk = []
+    for word in words:
+        chunk.append(word)
+        if len(chunk) == chunk_size:
+            runs.append(write_run(chunk, open_run()))
+            chunk = []
+    if chunk:
+        runs.append(write_run(chunk, open_run()))
+    
+    merged = iter_merge_all([iter_run(run_file) for run_file in runs])
+    for word in iter_remove_duplicates(merged):
+        yield word
+    for run_file in runs:
+        run_file.close()
+
+def write_run(chunk, run_file):
+    """
+    Sort chunk, dropping duplicates, and write it to run_file one word
+    per line.  Returns run_file
+    """
+    for word in remove_duplicates(merge_sort(chunk)):
+        run_file.write(word + "\n")
+    return run_file
 
 # Function to generate all strings for the word wrangler game
 
@@ -134,6 +390,132 @@ def gen_all_strings(word):
                 result.append(new_string)
     return result + rest_strings
 
+def iter_all_strings(word, min_length = 0, max_length = None, trie = None):
+    """
+    Generator that yields every distinct string that can be composed
+    from the letters in word, exactly once and in sorted order.
+    Strings are built letter by letter from the letter counts, so
+    repeated letters produce no duplicates and only the current string
+    is held in memory.
+
+    Only strings with min_length to max_length letters are yielded.
+    If trie is given, as built by build_prefix_trie, strings that no
+    word in it starts with are skipped together with all their
+    extensions.
+    """
+    counts = {}
+    for letter in word:
+        counts[letter] = counts.get(letter, 0) + 1
+    if max_length == None:
+        max_length = len(word)
+    for string in iter_extensions("", counts, sorted(counts),
+                                  min_length, max_length, trie):
+        yield string
+
+def iter_extensions(prefix, counts, letters, min_length, max_length, node):
+    """
+    Generator that yields prefix and every extension of it by the
+    letters left in counts, for iter_all_strings.  node is the trie
+    node reached by prefix, or None when there is no trie.
+    """
+    if len(prefix) >= min_length:
+        yield prefix
+    if len(prefix) == max_length:
+        return
+    for letter in letters:
+        if counts[letter] == 0:
+            continue
+        child = None
+        if node != None:
+            if letter not in node:
+                continue
+            child = node[letter]
+        counts[letter] -= 1
+        for string in iter_extensions(prefix + letter, counts, letters,
+                                      min_length, max_length, child):
+            yield string
+        counts[letter] += 1
+
+def build_prefix_trie(words):
+    """
+    Build a trie of the prefixes of words.
+
+    Returns nested dictionaries: the root maps each first letter to
+    the node for that one letter prefix, and so on.
+    """
+    root = {}
+    for word in words:
+        node = root
+        for letter in word:
+            if letter not in node:
+                node[letter] = {}
+            node = node[letter]
+    return root
+
+# Functions to look up words by their sorted letters
+
+def word_signature(word):
+    """
+    Return the letters of word in sorted order.  Two words have the
+    same signature exactly when they are anagrams of each other.
+    """
+    return "".join(sorted(word))
+
+def build_signature_index(words):
+    """
+    Index a word list by signature.
+
+    Returns a dictionary mapping each signature to the sorted list of
+    words that have it.
+    """
+    index = {}
+    for word in words:
+        index.setdefault(word_signature(word), []).append(word)
+    for signature in index:
+        index[signature] = merge_sort(index[signature])
+    return index
+
+def gen_sub_signatures(word):
+    """
+    Generate the signature of every sub-multiset of the letters in
+    word, each exactly once, without generating any orderings.
+
+    Returns a list of signatures, including the empty one.
+    """
+    counts = {}
+    for letter in word:
+        counts[letter] = counts.get(letter, 0) + 1
+    
+    signatures = [""]
+    for letter in sorted(counts):
+        signatures = [signature + letter * num for signature in signatures
+                      for num in range(counts[letter] + 1)]
+    return signatures
+
+def find_words(word, index):
+    """
+    Find the words in a signature index that can be composed from the
+    letters in word.
+
+    Returns a sorted list of words.
+    """
+    result = []
+    for signature in gen_sub_signatures(word):
+        result.extend(index.get(signature, []))
+    return merge_sort(result)
+
+def index_strings(index):
+    """
+    Return a function that can stand in for gen_all_strings in the
+    game: it returns only the strings that are words in index.
+    """
+    def gen_index_strings(word):
+        """
+        Return the words in index composed from the letters in word
+        """
+        return find_words(word, index)
+    return gen_index_strings
+
 # Function to load words from a file
 
 def load_words(filename):
@@ -152,6 +534,593 @@ def load_words(filename):
     
     return data
 
+class WordTable:
+    """
+    Compiled word list: the sorted, distinct words joined into one
+    string, with a table of the offset at which each word starts.
+    The optional signature index lists the distinct signatures in
+    sorted order, each with the numbers of its words.  Everything is
+    held in one string of fixed width hexadecimal fields followed by
+    the words, as written by compile_word_table, so lookups and sorted
+    iteration work directly on that string or on a memory map of it.
+    """
+
+    def __init__(self, words = None, with_signatures = False, data = None):
+        """
+        Compile a word list, indexing signatures if asked to.  If data
+        is given, it is an already compiled table, as a string or a
+        memory map, and words is ignored.
+        """
+        if data == None:
+            data = compile_word_table(words, with_signatures)
+        self._data = data
+        header_end = data.find("\n") + 1
+        num_words, num_signatures = [int(val) for val in
+                                     data[:header_end].split()[1:]]
+        self._num_words = num_words
+        self._num_signatures = num_signatures
+        self._offsets = header_end
+        self._signature_offsets = self._offsets + FIELD_WIDTH * (num_words + 1)
+        self._signature_starts = (self._signature_offsets
+                                  + FIELD_WIDTH * (num_signatures + 1))
+        numbers_length = self.field(self._signature_starts, num_signatures)
+        self._numbers = self._signature_starts + FIELD_WIDTH * (num_signatures + 1)
+        self._words = self._numbers + FIELD_WIDTH * numbers_length
+        self._signatures = self._words + self.field(self._offsets, num_words)
+        self._signature_index = None
+    
+    def field(self, start, idx):
+        """
+        Return the value of field number idx of the table of fields
+        that starts at start
+        """
+        pos = start + FIELD_WIDTH * idx
+        return int(self._data[pos:pos + FIELD_WIDTH], 16)
+    
+    def __len__(self):
+        """
+        Return the number of words
+        """
+        return self._num_words
+    
+    def word(self, idx):
+        """
+        Return word number idx in sorted order
+        """
+        start = self._words + self.field(self._offsets, idx)
+        end = self._words + self.field(self._offsets, idx + 1) - 1
+        return self._data[start:end]
+    
+    def signature(self, idx):
+        """
+        Return signature number idx of the signature index in sorted
+        order
+        """
+        start = self._signatures + self.field(self._signature_offsets, idx)
+        end = self._signatures + self.field(self._signature_offsets, idx + 1) - 1
+        return self._data[start:end]
+    
+    def __contains__(self, word):
+        """
+        Return True if word is in the table, by binary search
+        """
+        low = 0
+        high = len(self)
+        while low < high:
+            mid = (low + high) / 2
+            if self.word(mid) < word:
+                low = mid + 1
+            else:
+                high = mid
+        return low < len(self) and self.word(low) == word
+    
+    def iter_words(self):
+        """
+        Generator that yields the words in sorted order
+        """
+        for idx in range(len(self)):
+            yield self.word(idx)
+    
+    def signature_numbers(self, signature):
+        """
+        Return the numbers of the words with the given signature.  A
+        table compiled without signatures builds its index in memory
+        the first time it is asked.
+        """
+        if self._num_signatures == 0 and len(self) > 0:
+            if self._signature_index == None:
+                self._signature_index = {}
+                for idx in range(len(self)):
+                    self._signature_index.setdefault(
+                        word_signature(self.word(idx)), []).append(idx)
+            return self._signature_index.get(signature, [])
+        
+        low = 0
+        high = self._num_signatures
+        while low < high:
+            mid = (low + high) / 2
+            if self.signature(mid) < signature:
+                low = mid + 1
+            else:
+                high = mid
+        if low == self._num_signatures or self.signature(low) != signature:
+            return []
+        return [self.field(self._numbers, pos) for pos in
+                range(self.field(self._signature_starts, low),
+                      self.field(self._signature_starts, low + 1))]
+    
+    def find_words(self, word):
+        """
+        Find the words that can be composed from the letters in word,
+        using the signature index.
+
+        Returns a sorted list of words.
+        """
+        numbers = []
+        for signature in gen_sub_signatures(word):
+            numbers.extend(self.signature_numbers(signature))
+        return [self.word(idx) for idx in merge_sort(numbers)]
+
+def compile_word_table(words, with_signatures = False):
+    """
+    Compile a word list into the string a WordTable works on: a header
+    line, the offsets of the words, the offsets of the signatures,
+    where the word numbers of each signature start and the word
+    numbers, all as fixed width hexadecimal fields, then the words and
+    the signatures, each ending with a newline.
+    """
+    words = remove_duplicates(merge_sort(words))
+    signatures = []
+    numbers = []
+    if with_signatures:
+        index = {}
+        for idx in range(len(words)):
+            index.setdefault(word_signature(words[idx]), []).append(idx)
+        signatures = merge_sort(index.keys())
+        for signature in signatures:
+            numbers.extend(index[signature])
+    
+    fields = []
+    for strings in (words, signatures):
+        offset = 0
+        fields.append(offset)
+        for string in strings:
+            offset += len(string) + 1
+            fields.append(offset)
+    start = 0
+    fields.append(start)
+    for signature in signatures:
+        start += len(index[signature])
+        fields.append(start)
+    fields.extend(numbers)
+    
+    header = "WORDTABLE %d %d\n" % (len(words), len(signatures))
+    return "".join([header, "".join([FIELD_FORMAT % val for val in fields]),
+                    "".join([word + "\n" for word in words]),
+                    "".join([signature + "\n" for signature in signatures])])
+
+class Dawg:
+    """
+    Directed acyclic word graph: a trie of the words in which equal
+    subtrees are shared.  Nodes are numbered from the root at 0, and
+    node idx owns the edges edge_start[idx] to edge_start[idx + 1] - 1,
+    sorted by letter.  As in WordTable, the graph is held in one
+    string, as written by compile_dawg: fixed width hexadecimal edge
+    starts, a final flag per node, a letter per edge and fixed width
+    target nodes.  Every lookup reads that string directly, so it may
+    also be a memory map of a saved graph.
+    """
+
+    def __init__(self, words = None, data = None):
+        """
+        Build the graph of a word list.  If data is given instead, it
+        is a compiled graph, as a string returned by dumps or a memory
+        map, and is used as it is.  With neither, the graph holds only
+        an empty root.
+        """
+        if data == None:
+            if words == None:
+                words = []
+            data = self.build(remove_duplicates(merge_sort(words)))
+        self._data = data
+        header_end = data.find("\n") + 1
+        num_nodes, num_edges = [int(val) for val in data[:header_end].split()[1:]]
+        self._num_nodes = num_nodes
+        self._edge_start = header_end
+        self._final = self._edge_start + FIELD_WIDTH * (num_nodes + 1)
+        self._edge_labels = self._final + num_nodes
+        self._edge_targets = self._edge_labels + num_edges
+    
+    def field(self, start, idx):
+        """
+        Return the value of field number idx of the table of fields
+        that starts at start
+        """
+        pos = start + FIELD_WIDTH * idx
+        return int(self._data[pos:pos + FIELD_WIDTH], 16)
+    
+    def is_final(self, node):
+        """
+        Return True if a word ends at node
+        """
+        return self._data[self._final + node] == "1"
+    
+    def build(self, words):
+        """
+        Build the graph of a sorted list of distinct words, sharing
+        equal subtrees as each word is added.
+        Returns the compiled graph from compile_dawg
+        """
+        children = [{}]
+        final = [False]
+        register = {}
+        unchecked = []
+        
+        def minimize(down_to):
+            """
+            Replace the unchecked nodes below depth down_to by equal
+            nodes already registered
+            """
+            while len(unchecked) > down_to:
+                parent, letter, child = unchecked.pop()
+                key = (final[child], tuple(sorted(children[child].items())))
+                if key in register:
+                    children[parent][letter] = register[key]
+                else:
+                    register[key] = child
+        
+        prev_word = ""
+        for word in words:
+            common = 0
+            while (common < len(word) and common < len(prev_word)
+                   and word[common] == prev_word[common]):
+                common += 1
+            minimize(common)
+            if unchecked:
+                node = unchecked[-1][2]
+            else:
+                node = 0
+            for letter in word[common:]:
+                children.append({})
+                final.append(False)
+                children[node][letter] = len(children) - 1
+                unchecked.append((node, letter, len(children) - 1))
+                node = len(children) - 1
+            final[node] = True
+            prev_word = word
+        minimize(0)
+        
+        # Number the nodes still in use breadth first from the root
+        numbers = {0: 0}
+        order = [0]
+        for node in order:
+            for letter in sorted(children[node]):
+                child = children[node][letter]
+                if child not in numbers:
+                    numbers[child] = len(order)
+                    order.append(child)
+        
+        labels = []
+        node_final = []
+        edge_start = [0]
+        edge_targets = []
+        for node in order:
+            node_final.append(final[node])
+            for letter in sorted(children[node]):
+                labels.append(letter)
+                edge_targets.append(numbers[children[node][letter]])
+            edge_start.append(len(edge_targets))
+        return compile_dawg(node_final, edge_start, "".join(labels), edge_targets)
+    
+    def num_nodes(self):
+        """
+        Return the number of nodes in the graph
+        """
+        return self._num_nodes
+    
+    def child(self, node, letter):
+        """
+        Return the node reached from node along letter, or None
+        """
+        first = self.field(self._edge_start, node)
+        last = self.field(self._edge_start, node + 1)
+        edge = self._data[self._edge_labels + first:self._edge_labels + last].find(letter)
+        if edge == -1:
+            return None
+        return self.field(self._edge_targets, first + edge)
+    
+    def walk(self, string):
+        """
+        Return the node reached by following string from the root, or
+        None if no word starts with string
+        """
+        node = 0
+        for letter in string:
+            node = self.child(node, letter)
+            if node == None:
+                return None
+        return node
+    
+    def __contains__(self, word):
+        """
+        Return True if word is in the graph
+        """
+        node = self.walk(word)
+        return node != None and self.is_final(node)
+    
+    def has_prefix(self, prefix):
+        """
+        Return True if some word in the graph starts with prefix
+        """
+        return self.walk(prefix) != None
+    
+    def iter_words(self, node = 0, prefix = ""):
+        """
+        Generator that yields the words below node, each preceded by
+        prefix, in sorted order
+        """
+        if self.is_final(node):
+            yield prefix
+        for edge in range(self.field(self._edge_start, node),
+                          self.field(self._edge_start, node + 1)):
+            for word in self.iter_words(self.field(self._edge_targets, edge),
+                                        prefix + self._data[self._edge_labels + edge]):
+                yield word
+    
+    def __iter__(self):
+        """
+        Iterate over the words in sorted order, so a Dawg can stand in
+        for a word list wherever one is only looped over
+        """
+        return self.iter_words()
+    
+    def iter_words_from_letters(self, word, min_length = 0, max_length = None):
+        """
+        Generator that yields, in sorted order, the words in the graph
+        that can be composed from the letters in word.  Like
+        iter_all_strings, but only letters on an edge of the graph are
+        tried, so strings that start no word are never built.
+        """
+        counts = {}
+        for letter in word:
+            counts[letter] = counts.get(letter, 0) + 1
+        if max_length == None:
+            max_length = len(word)
+        for found in self.iter_letter_words(0, "", counts, min_length, max_length):
+            yield found
+    
+    def iter_letter_words(self, node, prefix, counts, min_length, max_length):
+        """
+        Generator that yields the words below node, for
+        iter_words_from_letters
+        """
+        if self.is_final(node) and len(prefix) >= min_length:
+            yield prefix
+        if len(prefix) == max_length:
+            return
+        for edge in range(self.field(self._edge_start, node),
+                          self.field(self._edge_start, node + 1)):
+            letter = self._data[self._edge_labels + edge]
+            if counts.get(letter, 0) == 0:
+                continue
+            counts[letter] -= 1
+            for found in self.iter_letter_words(self.field(self._edge_targets, edge),
+                                                prefix + letter, counts,
+                                                min_length, max_length):
+                yield found
+            counts[letter] += 1
+    
+    def dumps(self):
+        """
+        Return the compiled graph as a string
+        """
+        return self._data[:]
+    
+    def save(self, filename):
+        """
+        Write the compiled graph to a file that map_dawg can map.
+        Local files are not available in CodeSkulptor, so this only
+        works in a desktop Python.
+        """
+        outfile = open(filename, "wb")
+        outfile.write(self.dumps())
+        outfile.close()
+
+def compile_dawg(final, edge_start, edge_labels, edge_targets):
+    """
+    Compile a graph given as a final flag per node, the start of the
+    edges of each node, a letter per edge and the target of each edge
+    into the string a Dawg works on: a header line, the edge starts as
+    fixed width hexadecimal fields, a "0" or "1" per node, the edge
+    letters and the edge targets as fixed width fields.
+    """
+    header = "DAWG %d %d\n" % (len(final), len(edge_labels))
+    return "".join([header, "".join([FIELD_FORMAT % val for val in edge_start]),
+                    "".join([str(int(flag)) for flag in final]),
+                    edge_labels,
+                    "".join([FIELD_FORMAT % val for val in edge_targets])])
+
+def load_dawg(data):
+    """
+    Rebuild a Dawg from the string returned by its dumps method
+    """
+    return Dawg(data = data)
+
+def map_dawg(filename):
+    """
+    Open a graph file written by Dawg.save as a Dawg over a read only
+    memory map of the file.  Memory maps are not available in
+    CodeSkulptor, so this only works in a desktop Python.
+    """
+    import mmap
+    infile = open(filename, "rb")
+    data = mmap.mmap(infile.fileno(), 0, access = mmap.ACCESS_READ)
+    infile.close()
+    return Dawg(data = data)
+
+def read_local_words(filename):
+    """
+    Read a word list from the local file named filename.
+
+    Returns a list of strings.
+    """
+    wordfile = open(filename)
+    data = [line.strip() for line in wordfile.readlines()]
+    wordfile.close()
+    return data
+
+def load_word_table(filename, with_signatures = True):
+    """
+    Load the local word file named filename as a WordTable.  On first
+    use the file is compiled into a table file next to it, named with
+    COMPILED_SUFFIX; later starts memory map that file instead of
+    reading the words.  The table file is rebuilt when the word file
+    is newer.  Local files and memory maps are not available in
+    CodeSkulptor, so this only works in a desktop Python.
+    """
+    import os
+    if filename not in WORD_TABLES:
+        compiled = filename + COMPILED_SUFFIX
+        if (not os.path.exists(compiled) 
+            or os.path.getmtime(compiled) < os.path.getmtime(filename)):
+            outfile = open(compiled, "wb")
+            outfile.write(compile_word_table(read_local_words(filename),
+                                             with_signatures))
+            outfile.close()
+        WORD_TABLES[filename] = map_word_table(compiled)
+    return WORD_TABLES[filename]
+
+def map_word_table(filename):
+    """
+    Open a table file written by load_word_table as a WordTable over a
+    read only memory map of the file
+    """
+    import mmap
+    infile = open(filename, "rb")
+    data = mmap.mmap(infile.fileno(), 0, access = mmap.ACCESS_READ)
+    infile.close()
+    return WordTable(data = data)
+
+# Functions to benchmark the word list operations
+
+def synthetic_words(num_words, min_length = 3, max_length = 8):
+    """
+    Return a list of num_words random lowercase words of min_length
+    to max_length letters, in random order and with repeats
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = []
+    for dummy_idx in range(num_words):
+        length = random.randint(min_length, max_length)
+        words.append("".join([random.choice(letters) for dummy_pos in range(length)]))
+    return words
+
+def time_call(func, *args):
+    """
+    Return the seconds taken by one call of func with args.  As timeit
+    does, the number of calls per run is doubled until a run lasts
+    BENCHMARK_MIN_TIME, and the best of BENCHMARK_REPEATS runs is kept,
+    so that short operations are not swamped by timer noise.
+    """
+    number = 1
+    best = time_calls(number, func, args)
+    while best < BENCHMARK_MIN_TIME:
+        number *= 2
+        best = time_calls(number, func, args)
+    for dummy_run in range(BENCHMARK_REPEATS - 1):
+        best = min(best, time_calls(number, func, args))
+    return best / number
+
+def time_calls(number, func, args):
+    """
+    Return the seconds taken by number calls of func with args
+    """
+    start = time.time()
+    for dummy_call in range(number):
+        func(*args)
+    return time.time() - start
+
+def run_benchmarks(sizes = BENCHMARK_SIZES, seed_lengths = BENCHMARK_SEED_LENGTHS,
+                   filename = None):
+    """
+    Time the word list operations on synthetic dictionaries of each
+    size and on seed words of each length, printing one line per
+    timing.  If filename is given, the dictionary in it is also timed
+    with load_words.
+
+    Returns a dictionary mapping "operation/size" to seconds.
+    """
+    results = {}
+    for size in sizes:
+        words = synthetic_words(size)
+        sorted_words = merge_sort(words)
+        distinct = remove_duplicates(sorted_words)
+        sample = merge_sort(random.sample(distinct, min(1000, len(distinct))))
+        half = len(sorted_words) / 2
+        
+        results["merge_sort/%d" % size] = time_call(merge_sort, words)
+        results["merge_sort_sorted/%d" % size] = time_call(merge_sort, sorted_words)
+        results["remove_duplicates/%d" % size] = time_call(remove_duplicates, sorted_words)
+        results["merge/%d" % size] = time_call(merge, sorted_words[:half],
+                                               sorted_words[half:])
+        results["intersect/%d" % size] = time_call(intersect, distinct,
+                                                   distinct[::2])
+        results["intersect_sample/%d" % size] = time_call(intersect, sample, distinct)
+        
+        index = build_signature_index(distinct)
+        for length in seed_lengths:
+            seed = "".join([random.choice("abcdefghijklmnopqrstuvwxyz")
+                            for dummy_pos in range(length)])
+            results["find_words/%d/%d" % (size, length)] = time_call(
+                find_words, seed, index)
+    
+    for length in seed_lengths:
+        if length <= GEN_ALL_MAX:
+            results["gen_all_strings/%d" % length] = time_call(
+                gen_all_strings, "abcdefghijkl"[:length])
+    if filename != None:
+        results["load_words"] = time_call(load_words, filename)
+    
+    for name in sorted(results):
+        print "%s: %.4fs" % (name, results[name])
+    return results
+
+def save_results(results, filename):
+    """
+    Write benchmark results to filename as JSON.  Local files are not
+    available in CodeSkulptor, so this only works in a desktop Python.
+    """
+    import json
+    outfile = open(filename, "w")
+    json.dump(results, outfile, indent = 2, sort_keys = True)
+    outfile.close()
+
+def load_results(filename):
+    """
+    Read benchmark results written by save_results
+    """
+    import json
+    infile = open(filename)
+    results = json.load(infile)
+    infile.close()
+    return results
+
+def compare_results(results, baseline, factor = REGRESSION_FACTOR):
+    """
+    Compare benchmark results with a baseline, printing each timing
+    that is more than factor times slower.
+
+    Returns a sorted list of (name, baseline seconds, seconds) for
+    the regressions.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name in baseline and results[name] > factor * baseline[name]:
+            regressions.append((name, baseline[name], results[name]))
+            print "regression in %s: %.4fs, baseline %.4fs" % (
+                name, results[name], baseline[name])
+    return regressions
+
 def run():
     """
     Run game.
@@ -178,10 +1147,16 @@ def run():
     #print "all strings", all_strings
     
     words = load_words(WORDFILE)
+    #words = list(load_word_table(WORDFILE).iter_words())
+    #words = Dawg(words)
+    index = build_signature_index(words)
     wrangler = provided.WordWrangler(words, remove_duplicates, 
                                      intersect, merge_sort, 
-                                    gen_all_strings)
+                                    index_strings(index))
     provided.run_game(wrangler)
 
 # Uncomment when you are ready to try the game
-run()
\ No newline at end of file
+run()
+
+#results = run_benchmarks([10000])
+#compare_results(results, load_results("wrangler_baseline.json"))
\ No newline at end of file
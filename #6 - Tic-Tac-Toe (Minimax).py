@@ -5,7 +5,8 @@ Mini-max Tic-Tac-Toe Player
 import poc_ttt_gui
 import poc_ttt_provided as provided
 
-# Set timeout, as mini-max can take a long time
+# Set timeout, as mini-max can take a long time on boards larger than
+# 3x3, which are searched rather than looked up in PERFECT_PLAY
 import codeskulptor
 codeskulptor.set_timeout(60)
 
@@ -66,13 +67,460 @@ def mm_move(board, player):
                 return score, candidate_move
         return best_score, best_move
 
+# Masks of the lines through each square, row * dim + col, by board
+# dimension, for ab_search
+LINE_MASKS = {}
+
+def line_masks(dim):
+    """
+    Return a list with, for each square of a dim x dim board, the bit
+    masks of the rows, columns and diagonals through it
+    """
+    if dim not in LINE_MASKS:
+        lines = [[row * dim + col for col in range(dim)] for row in range(dim)]
+        lines += [[row * dim + col for row in range(dim)] for col in range(dim)]
+        lines.append([idx * dim + idx for idx in range(dim)])
+        lines.append([idx * dim + dim - 1 - idx for idx in range(dim)])
+        masks = [[] for dummy_square in range(dim * dim)]
+        for line in lines:
+            mask = 0
+            for square in line:
+                mask |= 1 << square
+            for square in line:
+                masks[square].append(mask)
+        LINE_MASKS[dim] = masks
+    return LINE_MASKS[dim]
+
+def is_reversed(board):
+    """
+    Find out from board.check_win whether the game is reversed, so
+    that completing a line loses.  A copy of board gets one line
+    completed by a player with no pieces on it.  board must not be
+    won, lost or drawn already.
+
+    Returns True for a reversed game.  When no line can be completed
+    any more, no game from board can be won or lost, and the answer is
+    False.
+    """
+    dim = board.get_dim()
+    lines = [[(row, col) for col in range(dim)] for row in range(dim)]
+    lines += [[(row, col) for row in range(dim)] for col in range(dim)]
+    lines.append([(idx, idx) for idx in range(dim)])
+    lines.append([(idx, dim - 1 - idx) for idx in range(dim)])
+    for line in lines:
+        for player in (provided.PLAYERX, provided.PLAYERO):
+            if [square for square in line
+                if board.square(square[0], square[1]) not in (provided.EMPTY, player)]:
+                continue
+            test_board = board.clone()
+            for square in line:
+                test_board.move(square[0], square[1], player)
+            return test_board.check_win() != player
+    return False
+
+# Transposition table flags: the stored score is exact, a lower bound
+# or an upper bound on the true score of the position
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Transposition tables shared by calls of mm_move_ab, one for normal
+# and one for reversed games, keyed by canonical_bits
+TRANSPOSITIONS = {False: {}, True: {}}
+
+# Nodes visited and transposition table hits in the last mm_move_ab
+SEARCH_STATS = {"nodes": 0, "cache_hits": 0}
+
+# Square orders of the 8 rotations and reflections, keyed by dimension
+SYMMETRIES = {}
+
+def symmetries(dim):
+    """
+    Compute the 8 rotations and reflections of a dim x dim board.
+
+    Returns a list of pairs (forward, source) of lists of square
+    indices, row * dim + col: square idx moves to forward[idx], and
+    square idx of the transformed board comes from source[idx].
+    """
+    if dim not in SYMMETRIES:
+        last = dim - 1
+        transforms = [lambda row, col: (row, col),
+                      lambda row, col: (col, last - row),
+                      lambda row, col: (last - row, last - col),
+                      lambda row, col: (last - col, row),
+                      lambda row, col: (row, last - col),
+                      lambda row, col: (col, row),
+                      lambda row, col: (last - row, col),
+                      lambda row, col: (last - col, last - row)]
+        result = []
+        for transform in transforms:
+            forward = [0] * (dim * dim)
+            source = [0] * (dim * dim)
+            for row in range(dim):
+                for col in range(dim):
+                    new_row, new_col = transform(row, col)
+                    forward[row * dim + col] = new_row * dim + new_col
+                    source[new_row * dim + new_col] = row * dim + col
+            result.append((forward, source))
+        SYMMETRIES[dim] = result
+    return SYMMETRIES[dim]
+
+# Lookup lists that apply each symmetry to a bit mask a byte at a
+# time, keyed by dimension
+BIT_SYMMETRIES = {}
+
+def bit_symmetries(dim):
+    """
+    Return, for each symmetry of symmetries(dim), a list of lookup
+    lists, one per byte of a board bit mask, that map the bits of that
+    byte to the bits of the squares they move to
+    """
+    if dim not in BIT_SYMMETRIES:
+        num_squares = dim * dim
+        result = []
+        for forward, dummy_source in symmetries(dim):
+            lookups = []
+            for first in range(0, num_squares, 8):
+                lookup = []
+                for byte in range(256):
+                    bits = 0
+                    for pos in range(min(8, num_squares - first)):
+                        if (byte >> pos) & 1:
+                            bits |= 1 << forward[first + pos]
+                    lookup.append(bits)
+                lookups.append(lookup)
+            result.append(lookups)
+        BIT_SYMMETRIES[dim] = result
+    return BIT_SYMMETRIES[dim]
+
+def canonical_bits(xbits, obits, x_to_move, dim):
+    """
+    Compute the key in the transposition table of the position with
+    the given bit masks of PLAYERX and PLAYERO squares: the smallest
+    of the 8 symmetric copies of the position, packed into one integer
+    with the player to move, so that symmetric positions share an
+    entry.
+
+    Returns a tuple of the key and the index of the symmetry that maps
+    the position onto it
+    """
+    shift = dim * dim
+    best_key = None
+    best_idx = 0
+    for idx, lookups in enumerate(bit_symmetries(dim)):
+        new_xbits = 0
+        new_obits = 0
+        byte_shift = 0
+        for lookup in lookups:
+            new_xbits |= lookup[(xbits >> byte_shift) & 255]
+            new_obits |= lookup[(obits >> byte_shift) & 255]
+            byte_shift += 8
+        key = new_xbits << shift | new_obits
+        if best_key == None or key < best_key:
+            best_key = key
+            best_idx = idx
+    if x_to_move:
+        return best_key << 1, best_idx
+    return best_key << 1 | 1, best_idx
+
+def board_bits(board):
+    """
+    Return the bit masks of the squares of PLAYERX and of PLAYERO on
+    board, with bit row * dim + col for square (row, col)
+    """
+    dim = board.get_dim()
+    xbits = 0
+    obits = 0
+    for row in range(dim):
+        for col in range(dim):
+            if board.square(row, col) == provided.PLAYERX:
+                xbits |= 1 << (row * dim + col)
+            elif board.square(row, col) == provided.PLAYERO:
+                obits |= 1 << (row * dim + col)
+    return xbits, obits
+
+def mm_move_ab(board, player, table = None):
+    """
+    Make a move on the board with an alpha-beta search that stores
+    every position searched in a transposition table.  Symmetric
+    positions share one entry.  The counts of nodes searched and of
+    table hits are left in SEARCH_STATS.
+    
+    The search never clones board.  The position is held in two bit
+    masks, one per player, so making a move is setting a bit of an
+    argument and undoing it is returning.  Only the lines through the
+    last move are checked for a win, and whether completing a line
+    wins or, in a reversed game, loses is found once by is_reversed.
+
+    table defaults to the table in TRANSPOSITIONS for the scoring of
+    board, normal or reversed, which is kept between calls.  A table
+    that is passed in must only be used for one of the two.
+    
+    Returns a tuple with two elements.  The first element is the score
+    of the given board and the second element is the desired move as a
+    tuple, (row, col).
+    """
+    SEARCH_STATS["nodes"] = 0
+    SEARCH_STATS["cache_hits"] = 0
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], (-1, -1)
+    reverse = is_reversed(board)
+    if table == None:
+        table = TRANSPOSITIONS[reverse]
+    
+    dim = board.get_dim()
+    if reverse:
+        line_value = -1
+    else:
+        line_value = 1
+    setup = (dim, line_masks(dim), (1 << (dim * dim)) - 1, line_value)
+    xbits, obits = board_bits(board)
+    score, square = ab_search(xbits, obits, player == provided.PLAYERX, -1,
+                              SCORES[provided.PLAYERO], SCORES[provided.PLAYERX],
+                              table, setup)
+    return score, (square / dim, square % dim)
+
+def ab_search(xbits, obits, x_to_move, last, alpha, beta, table, setup):
+    """
+    Alpha-beta search for mm_move_ab of the position with the given
+    bit masks, just after a move on square last, or -1 for the root.
+    setup is a tuple of the dimension, the line masks, the mask of all
+    squares and the value of completing a line for the player who
+    does.  The score is exact when it lies strictly between alpha and
+    beta, and otherwise only a bound beyond the one it reached.
+
+    Returns a tuple of the score and the square of the move, row * dim
+    + col, or -1 when the game is over.
+    """
+    SEARCH_STATS["nodes"] += 1
+    dim, masks, full, line_value = setup
+    if last >= 0:
+        if x_to_move:
+            mover_bits = obits
+            mover_score = SCORES[provided.PLAYERO]
+        else:
+            mover_bits = xbits
+            mover_score = SCORES[provided.PLAYERX]
+        for mask in masks[last]:
+            if mover_bits & mask == mask:
+                return mover_score * line_value, -1
+        if xbits | obits == full:
+            return SCORES[provided.DRAW], -1
+    
+    key, symmetry = canonical_bits(xbits, obits, x_to_move, dim)
+    if key in table:
+        score, flag, square = table[key]
+        if (flag == EXACT or (flag == LOWER and score >= beta)
+            or (flag == UPPER and score <= alpha)):
+            SEARCH_STATS["cache_hits"] += 1
+            return score, symmetries(dim)[symmetry][1][square]
+    
+    first_alpha = alpha
+    first_beta = beta
+    best_square = -1
+    occupied = xbits | obits
+    if x_to_move:
+        best_score = SCORES[provided.PLAYERO] - 1
+        for square in range(dim * dim):
+            if (occupied >> square) & 1:
+                continue
+            score, dummy_square = ab_search(xbits | 1 << square, obits, False,
+                                            square, alpha, beta, table, setup)
+            if score > best_score:
+                best_score = score
+                best_square = square
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+    else:
+        best_score = SCORES[provided.PLAYERX] + 1
+        for square in range(dim * dim):
+            if (occupied >> square) & 1:
+                continue
+            score, dummy_square = ab_search(xbits, obits | 1 << square, True,
+                                            square, alpha, beta, table, setup)
+            if score < best_score:
+                best_score = score
+                best_square = square
+            beta = min(beta, score)
+            if alpha >= beta:
+                break
+    
+    if best_score <= first_alpha:
+        flag = UPPER
+    elif best_score >= first_beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table[key] = (best_score, flag, symmetries(dim)[symmetry][0][best_square])
+    return best_score, best_square
+
+# Digits of each square in the base 3 board codes of PERFECT_PLAY
+SQUARE_DIGITS = {provided.EMPTY: 0, provided.PLAYERX: 1, provided.PLAYERO: 2}
+
+# The 8 lines of the 3x3 board as lists of square indices, row * 3 + col
+LINES_3X3 = [[0, 1, 2], [3, 4, 5], [6, 7, 8], [0, 3, 6],
+             [1, 4, 7], [2, 5, 8], [0, 4, 8], [2, 4, 6]]
+
+# Table entry for positions that cannot be reached, and the move
+# number stored for positions with no move left
+UNREACHABLE = -1
+NO_MOVE = 9
+
+def board_code(board):
+    """
+    Compute the base 3 code of the squares of board, row by row with
+    the first square lowest.  The tables of PERFECT_PLAY are indexed
+    by the code doubled, plus 1 when PLAYERO is to move.
+    """
+    code = 0
+    for row in range(2, -1, -1):
+        for col in range(2, -1, -1):
+            code = code * 3 + SQUARE_DIGITS[board.square(row, col)]
+    return code
+
+def build_perfect_table(reverse = False):
+    """
+    Solve every 3x3 position reachable from the empty board, with
+    either player moving first, by the same minimax as mm_move.  If
+    reverse is True, the game is reversed, so completing a line loses.
+
+    Returns a list indexed by 2 * board_code(board) + (1 if PLAYERO is
+    to move) whose entries are (score + 1) * 10 plus the index of the
+    best square, or NO_MOVE when the game is over, and UNREACHABLE for
+    positions no game reaches.
+    """
+    table = [UNREACHABLE] * (2 * 3 ** 9)
+    squares = [0] * 9
+    solve_perfect(squares, 0, 1, table, reverse)
+    solve_perfect(squares, 0, 2, table, reverse)
+    return table
+
+def solve_perfect(squares, code, digit, table, reverse):
+    """
+    Fill in the table entry of the position with the given squares and
+    base 3 code, with the player of the given digit to move, and of
+    every position after it, for build_perfect_table.
+    Returns the score of the position
+    """
+    index = 2 * code + digit - 1
+    if table[index] != UNREACHABLE:
+        return table[index] / 10 - 1
+    
+    score = None
+    for line in LINES_3X3:
+        if squares[line[0]] != 0 and squares[line[0]] == squares[line[1]] == squares[line[2]]:
+            if (squares[line[0]] == 1) != reverse:
+                score = SCORES[provided.PLAYERX]
+            else:
+                score = SCORES[provided.PLAYERO]
+    if score == None and 0 not in squares:
+        score = SCORES[provided.DRAW]
+    if score != None:
+        table[index] = (score + 1) * 10 + NO_MOVE
+        return score
+    
+    # PLAYERX (digit 1) maximizes and PLAYERO (digit 2) minimizes
+    sign = 1 if digit == 1 else -1
+    best_score = None
+    best_square = NO_MOVE
+    for square in range(9):
+        if squares[square] != 0:
+            continue
+        squares[square] = digit
+        score = solve_perfect(squares, code + digit * 3 ** square, 3 - digit,
+                              table, reverse)
+        squares[square] = 0
+        if best_score == None or sign * score > sign * best_score:
+            best_score = score
+            best_square = square
+    table[index] = (best_score + 1) * 10 + best_square
+    return best_score
+
+def dumps_perfect_table(table):
+    """
+    Return a table from build_perfect_table as a string with one
+    character per entry, "." for unreachable positions
+    """
+    return "".join(["." if entry == UNREACHABLE else chr(48 + entry)
+                    for entry in table])
+
+def loads_perfect_table(data):
+    """
+    Rebuild a table from the string returned by dumps_perfect_table
+    """
+    return [UNREACHABLE if char == "." else ord(char) - 48 for char in data]
+
+# File next to this one that the tables of PERFECT_PLAY are saved to
+PERFECT_PLAY_FILE = "ttt_perfect_play.txt"
+
+def load_perfect_play(filename = PERFECT_PLAY_FILE):
+    """
+    Return the perfect play tables for normal and reversed games, as a
+    dictionary keyed by reversal.  The tables are read from filename,
+    next to this file, when it holds them; otherwise they are solved
+    and saved there for later imports.  Local files are not available
+    in CodeSkulptor, so there the tables are always solved in memory.
+    """
+    try:
+        import os
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    except (ImportError, NameError):
+        return {False: build_perfect_table(False), True: build_perfect_table(True)}
+    
+    if os.path.exists(path):
+        infile = open(path)
+        lines = infile.read().split("\n")
+        infile.close()
+        if len(lines) >= 2 and len(lines[0]) == len(lines[1]) == 2 * 3 ** 9:
+            return {False: loads_perfect_table(lines[0]),
+                    True: loads_perfect_table(lines[1])}
+    
+    tables = {False: build_perfect_table(False), True: build_perfect_table(True)}
+    try:
+        outfile = open(path, "w")
+        outfile.write(dumps_perfect_table(tables[False]) + "\n"
+                      + dumps_perfect_table(tables[True]) + "\n")
+        outfile.close()
+    except IOError:
+        pass
+    return tables
+
+# Perfect play for every reachable 3x3 position of normal and of
+# reversed games, loaded or solved once at import
+PERFECT_PLAY = load_perfect_play()
+
+def perfect_move(board, player):
+    """
+    Look up the score and best move of a 3x3 board in the table of
+    PERFECT_PLAY for its scoring, normal or reversed.
+
+    Returns a tuple with the score and the move as a tuple, (row, col),
+    which is (-1, -1) when the game is over.
+    """
+    winner = board.check_win()
+    if winner != None:
+        return SCORES[winner], (-1, -1)
+    table = PERFECT_PLAY[is_reversed(board)]
+    entry = table[2 * board_code(board) + SQUARE_DIGITS[player] - 1]
+    if entry == UNREACHABLE:
+        return mm_move_ab(board, player)
+    square = entry % 10
+    if square == NO_MOVE:
+        return entry / 10 - 1, (-1, -1)
+    return entry / 10 - 1, (square / 3, square % 3)
+
 def move_wrapper(board, player, trials):
     """
     Wrapper to allow the use of the same infrastructure that was used
     for Monte Carlo Tic-Tac-Toe.
     """
     #print "in wrapper"
-    move = mm_move(board, player)
+    if board.get_dim() == 3:
+        move = perfect_move(board, player)
+    else:
+        move = mm_move_ab(board, player)
     assert move[1] != (-1, -1), "returned illegal move (-1, -1)"
     return move[1]
 